@@ -16,8 +16,10 @@ Types of Edges:
 from langgraph.graph import StateGraph, END
 from typing import TypedDict, Annotated
 import operator
+import re
 
 class AgentState(TypedDict):
+    # operator.add builds a new list per update; earlier snapshots of the channel stay untouched
     messages: Annotated[list, operator.add]
 
 def greet_node(state: AgentState) -> AgentState:
@@ -25,16 +27,23 @@ def greet_node(state: AgentState) -> AgentState:
     return {"messages": [new_message]}
 
 def search_node(state: AgentState) -> AgentState:
-    user_query = state["messages"][-1] if state["messages"] else ""
+    messages = state["messages"]
+    user_query = messages[-1] if messages else ""
     search_result = f"Searching for: '{user_query}'..."
     return {"messages": [search_result]}
 
+# Routing keywords -> destination node. Add entries here as the graph grows.
+ROUTES = {"search": "search"}
+# One case-insensitive pattern for all keywords: a single pass over the message, no lower() copy.
+ROUTE_PATTERN = re.compile("|".join(map(re.escape, ROUTES)), re.IGNORECASE)
+
 def decide_next_node(state: AgentState):
-    last_message = state["messages"][-1] if state["messages"] else ""
-    if "search" in last_message.lower():
-        return "search"
-    else:
-        return END
+    messages = state["messages"]
+    last_message = messages[-1] if messages else ""
+    match = ROUTE_PATTERN.search(last_message)
+    if match:
+        return ROUTES[match.group(0).lower()]
+    return END
 
 workflow = StateGraph(AgentState)
 workflow.add_node("greet", greet_node)
@@ -44,7 +53,7 @@ workflow.add_conditional_edges(
     "greet",
     decide_next_node,
     {
-        "search": "search",
+        **{node: node for node in ROUTES.values()},
         END: END,
     }
 )
@@ -5,6 +5,7 @@ NOTE: A LangGraph Graph defines the overall structure of an application by organ
 from langgraph.graph import StateGraph, END
 from typing import TypedDict, Annotated
 import operator
+import re
 
 class AgentState(TypedDict):
     messages: Annotated[list, operator.add]
@@ -27,16 +28,19 @@ def search_node(state: AgentState) -> AgentState:
     search_result = f"Searching for: '{user_query}'..."
     return {"messages": [search_result]}
 
+# Compiled once: a case-insensitive search over the original message, without a lower() copy per call
+SEARCH_PATTERN = re.compile(r"search", re.IGNORECASE)
+
 def decide_next_node(state: AgentState):
     """
     Determines the next node based on the last message content.
     If the message contains 'search', route to the search node; otherwise, end.
     """
-    last_message = state["messages"][-1] if state["messages"] else ""
-    if "search" in last_message.lower():
+    messages = state["messages"]
+    last_message = messages[-1] if messages else ""
+    if SEARCH_PATTERN.search(last_message):
         return "search"
-    else:
-        return END
+    return END
 
 # StateGraph: Main class for building a graph workflow.
 # Pass the state schema (AgentState) to define the structure of shared state.
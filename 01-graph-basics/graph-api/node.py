@@ -4,12 +4,17 @@ In LangGraph, a node is a function that performs a unit of work in the workflow.
 Nodes can represent agent actions, tool calls, or any computation.
 
 NOTE: A Node in LangGraph is a function that transforms state and represents one step in your AI workflow.
+
+NOTE: Always return a fresh update dict (e.g. {"messages": [new_message]}). LangGraph keeps a reference to it
+(stream_mode="updates" yields the same object, checkpointers may hold it), so pooling or reusing returned
+dicts/lists across steps would silently change earlier updates. The per-step allocation is cheap.
 """
 
 from typing import TypedDict, Annotated
 import operator
 
 class AgentState(TypedDict):
+    # Reducers must be pure: operator.add returns a new list and never changes a value already emitted
     messages: Annotated[list, operator.add]
 
 # node 1: Greets the user
@@ -27,7 +32,8 @@ def search_node(state: AgentState) -> AgentState:
     This node simulates a search based on the last user message.
     Nodes can contain any logic, including tool calls or LLM queries.
     """
-    user_query = state["messages"][-1] if state["messages"] else ""
+    messages = state["messages"]
+    user_query = messages[-1] if messages else ""
     search_result = f"Searching for: '{user_query}'..."
     return {"messages": [search_result]}
 
@@ -55,6 +61,12 @@ from langchain.tools import tool
 
 @tool
 def add(a: int, b: int) -> int:
+    """Add two integers."""
     return a + b
 
 tool_node = ToolNode([add])
+
+# add.invoke(...) validates the arguments through the tool's Pydantic schema on every call.
+# Trusted Python code that already holds two ints can call the plain function and skip that step;
+# LLM tool calls should still go through ToolNode so their arguments are validated.
+add_fast = add.func  # add_fast(2, 3) -> 5
@@ -17,9 +17,8 @@ def build_prompt(role: str, instruction: str, user_query: str) -> str:
     Returns:
         A formatted prompt string.
     """
-    system_msg = f"System: {role}. {instruction}"
-    human_msg = f"Human: {user_query}"
-    return f"{system_msg}\n{human_msg}"
+    # Single join instead of building the system/human parts as separate strings
+    return "".join(("System: ", role, ". ", instruction, "\nHuman: ", user_query))
 
 # Example: System, Human, and Assistant messages
 example_prompt = build_prompt(
@@ -104,8 +103,11 @@ print("Refined Prompt:\n", refined_prompt)
 # 3. Advanced Prompt Engineering Strategies
 # ----------------------------------------
 # a. Prompt Templates
+TRANSLATE_PREFIX = "System: You are a translator.\nHuman: Translate the following sentence to Spanish: "
+
 def prompt_template(sentence: str) -> str:
-    return f"System: You are a translator.\nHuman: Translate the following sentence to Spanish: {sentence}"
+    # The fixed part of the template is built once; only the sentence changes per call
+    return TRANSLATE_PREFIX + sentence
 print("\n--- Prompt Template Example ---\n", prompt_template("Good morning!"))
 
 # b. Role-Based Prompting
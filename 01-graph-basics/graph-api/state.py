@@ -5,6 +5,8 @@ State is a shared data structure that holds the current information or context o
 # State is usually defined using TypedDict (for key/value pairs) or dataclass/Pydantic for more features.
 
 from typing import TypedDict, Annotated
+from dataclasses import dataclass, field
+import operator
 from langchain_core.messages import HumanMessage, AIMessage
 from langgraph.graph.message import add_messages
 
@@ -19,6 +21,62 @@ class ComplexState(TypedDict):
     count: int
     messages: Annotated[list[HumanMessage | AIMessage], add_messages]  # Stores conversation history with reducer
 
+# Example 3: Custom Reducer with an ID Index (toy)
+# A teaching sketch of how a reducer can carry its own data structure. It is NOT a drop-in
+# replacement for add_messages: it does not assign IDs to messages that lack one, does not
+# understand RemoveMessage, and only accepts message objects (no tuples or plain strings).
+# It is also not checkpointable with the default JsonPlusSerializer (msgpack based), so use it
+# without a checkpointer or with a pickle-based serde.
+
+class MessageStore:
+    """
+    Message history that keeps an ID -> position index next to the list,
+    so replacing a message by ID is a dict lookup instead of a scan over the whole history.
+    """
+    __slots__ = ("messages", "index")
+
+    def __init__(self, messages=None):
+        self.messages = []
+        self.index = {}
+        for msg in messages or []:
+            self.upsert(msg)
+
+    def upsert(self, msg):
+        idx = self.index.get(msg.id) if msg.id else None
+        if idx is None:
+            if msg.id:
+                self.index[msg.id] = len(self.messages)
+            self.messages.append(msg)
+        else:
+            self.messages[idx] = msg  # Same ID: replace in place, like add_messages
+
+    def copy(self):
+        new = MessageStore()
+        new.messages = list(self.messages)
+        new.index = dict(self.index)
+        return new
+
+def add_messages_indexed(left: MessageStore, right) -> MessageStore:
+    # Reducers must not mutate their inputs, so work on a copy of the previous store
+    store = left.copy() if isinstance(left, MessageStore) else MessageStore(left)
+    for msg in right if isinstance(right, list) else [right]:
+        store.upsert(msg)
+    return store
+
+class IndexedState(TypedDict):
+    count: int
+    messages: Annotated[MessageStore, add_messages_indexed]  # Append new IDs, replace known IDs
+
+# Example 4: Dataclass State
+# StateGraph also accepts a dataclass. With slots=True each instance stores its fields in fixed slots
+# instead of a per-instance dict, and reducers are still declared with Annotated.
+# Nodes read fields as attributes (state.count) instead of keys (state["count"]) and still return dict updates.
+
+@dataclass(slots=True)
+class SlotsState:
+    count: int = 0
+    messages: Annotated[list, operator.add] = field(default_factory=list)
+
 
 """
 NOTE ON "add_messages":
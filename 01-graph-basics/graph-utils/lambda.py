@@ -6,6 +6,8 @@
 #
 # Example 1: Squaring numbers in a list using map and a lambda
 
+import operator
+
 square = lambda x: x * x
 
 nums = [1, 2, 3, 4, 5]
@@ -20,3 +22,11 @@ print(even_nums)  # Output: [2, 4]
 pairs = [(1, 3), (2, 2), (4, 1)]
 sorted_pairs = sorted(pairs, key=lambda pair: pair[1])
 print(sorted_pairs)  # Output: [(4, 1), (2, 2), (1, 3)]
+
+# Example 4: Faster alternatives for hot loops
+# A lambda is a Python-level call for every element. Comprehensions run the expression inline,
+# and operator.itemgetter is implemented in C, so both avoid that per-element call.
+squared_nums = [x * x for x in nums]
+even_nums = [x for x in nums if x % 2 == 0]
+sorted_pairs = sorted(pairs, key=operator.itemgetter(1))
+print(squared_nums, even_nums, sorted_pairs)  # Same results as Examples 1-3
@@ -34,17 +34,16 @@ def multiply_node(state: AgentState) -> AgentState:
     state['result'] = state['number_1'] * state['number_2']
     return state
 
+# Routing table: operation -> node name (one dict lookup instead of an if/elif chain)
+ROUTES = {"+": "add", "-": "subtract", "*": "multiply"}
+
 # Routing function: decides which node to run next based on 'operation'
 def route_operation(state: AgentState):
     op = state['operation']
-    if op == '+':
-        return "add"
-    elif op == '-':
-        return "subtract"
-    elif op == '*':
-        return "multiply"
-    else:
+    route = ROUTES.get(op)
+    if route is None:
         raise ValueError(f"Unknown operation: {op}")
+    return route
 
 
 # Build the conditional graph
@@ -60,11 +59,7 @@ workflow.add_edge(START, "router")
 workflow.add_conditional_edges(
     "router",
     route_operation,
-    {
-        "add": "add",
-        "subtract": "subtract",
-        "multiply": "multiply"
-    }
+    {node: node for node in ROUTES.values()}
 )
 workflow.add_edge("add", END)
 workflow.add_edge("subtract", END)
@@ -41,21 +41,18 @@ def should_continue_node(state: AgentState) -> str:
     """
     Returns the edge name to continue looping or finish based on the counter.
     """
-    if state['counter'] < 5:
-        return "continue_edge"
-    else:
-        return "finish_edge"
+    return "continue_edge" if state['counter'] < 5 else "finish_edge"
 
 # Build the workflow graph
 graph = StateGraph(AgentState)
 graph.add_node("greeting_node", greeting_node)
 graph.add_node("random_number_node", random_number_node)
-graph.add_node("should_continue_router", lambda state: state)  # Routing node for loop control
 
 
 graph.add_edge("greeting_node", "random_number_node")
-graph.add_edge("random_number_node", "should_continue_router")
-graph.add_conditional_edges("should_continue_router", should_continue_node, {
+# The routing function is attached straight to random_number_node: no pass-through router node,
+# so each loop iteration is one super-step instead of two.
+graph.add_conditional_edges("random_number_node", should_continue_node, {
     "continue_edge": "random_number_node",  # Loop again
     "finish_edge": END  # Finish
 })
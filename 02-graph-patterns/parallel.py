@@ -5,10 +5,12 @@ LangGraph Parallel Pattern
  This is useful for tasks like batch processing, running multiple agents/tools, or aggregating results.
 
  How it works:
- - After a node runs, the routing function can send the state to multiple nodes in parallel.
- - All parallel nodes execute, then the graph continues to the next step.
+ - Several edges out of the same node (here START) fan out: all targets run in the same super-step.
+ - Each parallel node returns only the key it writes ({"a": 2}), so the updates never collide.
+   Returning the whole state from both nodes would write 'a' and 'b' twice in one step (InvalidUpdateError).
+ - add_edge(["set_a", "set_b"], "aggregate") joins: aggregate waits until both have finished.
 """
-from langgraph.graph import StateGraph, END
+from langgraph.graph import StateGraph, START, END
 from typing import TypedDict
 
 class ParallelState(TypedDict):
@@ -17,40 +19,26 @@ class ParallelState(TypedDict):
     sum: int
 
 # Node: Set value for 'a'
-def set_a(state: ParallelState) -> ParallelState:
-    state['a'] = 2
-    return state
+def set_a(state: ParallelState) -> dict:
+    return {"a": 2}
 
 # Node: Set value for 'b'
-def set_b(state: ParallelState) -> ParallelState:
-    state['b'] = 3
-    return state
+def set_b(state: ParallelState) -> dict:
+    return {"b": 3}
 
 # Node: Aggregate results
-def aggregate(state: ParallelState) -> ParallelState:
-    state['sum'] = state['a'] + state['b']
-    return state
-
-# Routing function: after start, run both set_a and set_b in parallel
-def run_parallel(state: ParallelState):
-    return ["set_a", "set_b"]
+def aggregate(state: ParallelState) -> dict:
+    return {"sum": state['a'] + state['b']}
 
 workflow = StateGraph(ParallelState)
 workflow.add_node("set_a", set_a)
 workflow.add_node("set_b", set_b)
 workflow.add_node("aggregate", aggregate)
-workflow.set_entry_point("aggregate_start")
-workflow.add_node("aggregate_start", lambda state: state)  # dummy node to start parallel
-workflow.add_conditional_edges(
-    "aggregate_start",
-    run_parallel,
-    {
-        "set_a": "set_a",
-        "set_b": "set_b"
-    }
-)
-workflow.add_edge("set_a", "aggregate")
-workflow.add_edge("set_b", "aggregate")
+# Fan out: both nodes start in the same super-step
+workflow.add_edge(START, "set_a")
+workflow.add_edge(START, "set_b")
+# Join: aggregate runs once, after both set_a and set_b
+workflow.add_edge(["set_a", "set_b"], "aggregate")
 workflow.add_edge("aggregate", END)
 
 app = workflow.compile()
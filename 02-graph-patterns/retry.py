@@ -70,9 +70,10 @@ def decrement_node(state: AgentState):
 
 
 def check_node(state: AgentState):
-    if state["number"] == 0:
-        return "stop"
-    return "loop"
+    # Common case first: keep looping until the number reaches 0
+    if state["number"] != 0:
+        return "loop"
+    return "stop"
 
 
 # ---- Retry Policy (IMPORTANT FIX) ----
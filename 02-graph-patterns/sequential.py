@@ -49,7 +49,24 @@ workflow.add_edge("double", END)
 # Compile and run the graph
 app = workflow.compile()
 
+# Alternative: fused pipeline.
+# Every node above is plain, side-effect-free Python, so the three steps can run as one node:
+# a single super-step instead of three (fewer channel writes, scheduler passes and checkpoints).
+# Keep separate nodes when a step calls an LLM/tool, needs its own retries, or should be streamed/inspected on its own.
+def fused_node(state: SeqState) -> SeqState:
+    """
+    Runs initialize -> increment -> double in one step.
+    """
+    return double_node(increment_node(initialize_node(state)))
+
+fused_workflow = StateGraph(SeqState)
+fused_workflow.add_node("fused", fused_node)
+fused_workflow.set_entry_point("fused")
+fused_workflow.add_edge("fused", END)
+fused_app = fused_workflow.compile()
+
 if __name__ == "__main__":
     print("--- Sequential Pattern Example ---")
     result = app.invoke({})
     print("Final state:", result)  # Should print: {'value': 4}
+    print("Fused final state:", fused_app.invoke({}))  # Same result in one super-step
@@ -5,7 +5,9 @@ Async event streaming demo with LangGraph and ToolNode.
 
 """
 import asyncio
-import requests
+import time
+from collections import OrderedDict
+import httpx
 from typing import TypedDict, Sequence, Annotated
 from langchain_core.messages import HumanMessage, BaseMessage, SystemMessage
 from langchain_core.tools import tool
@@ -17,30 +19,74 @@ from langgraph.prebuilt import ToolNode
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
 
-@tool
-def get_weather(city: str) -> str:
-    """Get the current temperature in Celsius for a given city via Open-Meteo."""
-    try:
-        geo_resp = requests.get(
-            f"https://geocoding-api.open-meteo.com/v1/search?name={city}",
-            timeout=10,
+# Shared async client: the tool awaits its HTTP calls instead of blocking the event loop
+# (so token streaming keeps flowing), and keep-alive connections are reused across calls.
+HTTP_CLIENT = httpx.AsyncClient(
+    timeout=10.0,
+    limits=httpx.Limits(max_keepalive_connections=20),
+)
+
+# Two small TTL caches so repeat questions in a session don't go back to Open-Meteo:
+# lowercased city -> (lat, lon) or None for an hour, and (lat, lon) -> temperature for 10 minutes.
+# Both are LRUs (least recently used first) capped at CACHE_SIZE entries, so they can't grow without bound.
+GEOCODE_TTL = 3600
+FORECAST_TTL = 600
+CACHE_SIZE = 1024
+_coords_cache = OrderedDict()  # key -> (expires_at, coords)
+_forecast_cache = OrderedDict()  # (lat, lon) -> (expires_at, temperature)
+
+def _cache_get(cache: OrderedDict, key):
+    """Return the live (expires_at, value) entry for key, or None; expired entries are dropped."""
+    hit = cache.get(key)
+    if hit is None:
+        return None
+    if hit[0] < time.monotonic():
+        del cache[key]
+        return None
+    cache.move_to_end(key)
+    return hit
+
+def _cache_put(cache: OrderedDict, key, ttl: float, value):
+    hit = cache[key] = (time.monotonic() + ttl, value)
+    cache.move_to_end(key)
+    if len(cache) > CACHE_SIZE:
+        cache.popitem(last=False)
+    return hit
+
+async def _city_coords(city: str):
+    key = city.strip().lower()
+    hit = _cache_get(_coords_cache, key)
+    if hit is None:
+        geo_resp = await HTTP_CLIENT.get(
+            "https://geocoding-api.open-meteo.com/v1/search", params={"name": city}
         )
         geo_resp.raise_for_status()
-        geo = geo_resp.json()
-        if not geo.get("results"):
-            return f"City '{city}' not found."
-
-        lat = geo["results"][0]["latitude"]
-        lon = geo["results"][0]["longitude"]
-
-        weather_resp = requests.get(
+        results = geo_resp.json().get("results")
+        coords = (results[0]["latitude"], results[0]["longitude"]) if results else None
+        hit = _cache_put(_coords_cache, key, GEOCODE_TTL, coords)
+    return hit[1]
+
+async def _current_temperature(lat: float, lon: float):
+    hit = _cache_get(_forecast_cache, (lat, lon))
+    if hit is None:
+        weather_resp = await HTTP_CLIENT.get(
             "https://api.open-meteo.com/v1/forecast",
             params={"latitude": lat, "longitude": lon, "current_weather": "true"},
-            timeout=10,
         )
         weather_resp.raise_for_status()
-        weather = weather_resp.json()
-        temp = weather["current_weather"]["temperature"]
+        temp = weather_resp.json()["current_weather"]["temperature"]
+        hit = _cache_put(_forecast_cache, (lat, lon), FORECAST_TTL, temp)
+    return hit[1]
+
+@tool
+async def get_weather(city: str) -> str:
+    """Get the current temperature in Celsius for a given city via Open-Meteo."""
+    try:
+        coords = await _city_coords(city)
+        if coords is None:
+            return f"City '{city}' not found."
+
+        temp = await _current_temperature(*coords)
         return f"The current temperature in {city} is {temp}°C."
     except Exception as e:
         return f"Error fetching weather: {e}"
@@ -55,15 +101,18 @@ llm = ChatOllama(
 ).bind_tools(tool_list)
 
 
-def llm_processor_node(state: AgentState) -> AgentState:
-    """Call the LLM with the conversation so far and append AI response."""
-    system_prompt = SystemMessage(
-        content=(
-            "You are an AI assistant. When the user asks about weather, call the tool. "
-            "Otherwise, answer directly. Keep responses concise."
-        )
+SYSTEM_WEATHER = SystemMessage(
+    content=(
+        "You are an AI assistant. When the user asks about weather, call the tool. "
+        "Otherwise, answer directly. Keep responses concise."
     )
-    response = llm.invoke([system_prompt] + list(state["messages"]))
+)
+
+
+async def llm_processor_node(state: AgentState) -> AgentState:
+    """Call the LLM with the conversation so far and append AI response."""
+    # Async call: on_chat_model_stream events reach astream_events as tokens arrive, without a worker thread
+    response = await llm.ainvoke([SYSTEM_WEATHER, *state["messages"]])
     # Return a partial update; `add_messages` will append it to state
     return {"messages": [response]}
 
@@ -126,5 +175,6 @@ if __name__ == "__main__":
                 print("Bye!")
                 break
             await demo_events(user_text)
+        await HTTP_CLIENT.aclose()
 
     asyncio.run(main())
@@ -18,6 +18,8 @@ from langgraph.prebuilt import ToolNode
 from langchain_core.tools import tool
 from langgraph.graph.message import add_messages
 import requests
+import sys
+import time
 
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
@@ -44,18 +46,20 @@ def get_weather(city: str) -> str:
 tool_list = [get_weather]
 llm = ChatOllama(model="llama3.2:3b", temperature=0).bind_tools(tool_list)
 
+# Built once and reused on every call
+system_prompt = SystemMessage(
+    content="You are an AI assistant. Use tools for math, weather, or user data queries."
+)
+
 def llm_processor_node(state: AgentState) -> AgentState:
     """Process messages with LLM and append response."""
-    system_prompt = SystemMessage(
-        content="You are an AI assistant. Use tools for math, weather, or user data queries."
-    )
-    response = llm.invoke([system_prompt] + list(state["messages"]))
+    response = llm.invoke([system_prompt, *state["messages"]])
     return {"messages": [response]}
 
 def should_continue_node(state: AgentState) -> str:
     """Decide whether to continue or end based on tool calls."""
     last_message = state["messages"][-1]
-    if hasattr(last_message, "tool_calls") and last_message.tool_calls:
+    if getattr(last_message, "tool_calls", None):
         return "continue"
     return "end"
 
@@ -71,32 +75,62 @@ graph.add_conditional_edges("llm_processor_node", should_continue_node, {
 graph.add_edge("tool_nodes", "llm_processor_node")
 app = graph.compile()
 
+class StreamWriter:
+    """
+    Buffers streamed tokens and writes them to stdout in batches (every `max_items` tokens or `max_delay` seconds),
+    instead of one write + flush per token.
+    """
+    def __init__(self, max_items: int = 16, max_delay: float = 0.05):
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self.buffer = []
+        self.last_flush = time.monotonic()
+
+    def write(self, text: str):
+        self.buffer.append(text)
+        if len(self.buffer) >= self.max_items or "\n" in text or time.monotonic() - self.last_flush >= self.max_delay:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            sys.stdout.write("".join(self.buffer))
+            self.buffer.clear()
+        sys.stdout.flush()
+        self.last_flush = time.monotonic()
+
 # Streaming modes
 def stream_messages(user_text: str):
     state_in: AgentState = {"messages": [HumanMessage(content=user_text)]}
     print("⏳ Processing...")
+    out = StreamWriter()
     for message, meta in app.stream(input=state_in, stream_mode="messages"):
-        print(message.content, end="", flush=True)
-    print()
+        out.write(message.content)
+    out.write("\n")
+    out.flush()
 
 def stream_updates(user_text: str):
     state_in: AgentState = {"messages": [HumanMessage(content=user_text)]}
     print("🔄 Streaming updates...")
+    out = StreamWriter()
     for update in app.stream(input=state_in, stream_mode="updates"):
         for node_name, delta in update.items():
-            print(f"[{node_name}] {list(delta.keys())} updated")
-            if "messages" in delta:
-                msg = delta["messages"][-1]
-                print("  ↳", getattr(msg, "content", msg))
+            out.write(f"[{node_name}] {', '.join(delta)} updated\n")
+            messages = delta.get("messages")
+            if messages:
+                msg = messages[-1]
+                out.write(f"  ↳ {getattr(msg, 'content', msg)}\n")
+    out.flush()
 
 def stream_values(user_text: str):
     state_in: AgentState = {"messages": [HumanMessage(content=user_text)]}
     print("🧩 Streaming full state values...")
+    out = StreamWriter()
     final_state = None
     for state in app.stream(input=state_in, stream_mode="values"):
         final_state = state
         last = state["messages"][-1]
-        print("State changed → last message:", getattr(last, "content", last))
+        out.write(f"State changed → last message: {getattr(last, 'content', last)}\n")
+    out.flush()
     print("\n✅ Done. Final assistant message:", final_state["messages"][-1].content)
 
 # Interactive loop (default: messages)
@@ -16,6 +16,13 @@ References
 
 from typing import TypedDict, Sequence, Annotated, List, Optional
 import uuid
+import itertools
+import logging
+import threading
+from functools import lru_cache
+from collections import deque
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timezone
 from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, AIMessage
 from langgraph.graph import StateGraph, START, END
@@ -28,9 +35,15 @@ from langchain_chroma import Chroma
 from langchain_core.runnables import RunnableConfig
 
 # --- Structured long-term memory (namespaced key-value store) ---
+_TOY_VECTOR = [0.0, 1.0]
+
 def _toy_embed(texts: list[str]) -> list[list[float]]:
-    """Toy embedding function for demonstration. Replace with a real model in production."""
-    return [[float(i) for i in range(2)] for _ in texts]
+    """
+    Toy embedding function for demonstration. Replace with a real model in production
+    (e.g. index={"embed": embeddings, "dims": 768} for nomic-embed-text).
+    Every text maps to the same constant vector, shared instead of rebuilt per text.
+    """
+    return [_TOY_VECTOR] * len(texts)
 
 store = InMemoryStore(index={"embed": _toy_embed, "dims": 2})
 
@@ -42,10 +55,25 @@ vector = Chroma(
     persist_directory="./chroma_db",  # Persistent local vector DB
 )
 
+# Recalls run side by side on _recall_pool; new events are embedded and written to Chroma on
+# _chroma_writer (a single worker keeps writes in order), off the request path.
+_recall_pool = ThreadPoolExecutor(max_workers=2)
+_chroma_writer = ThreadPoolExecutor(max_workers=1)
+_pending_upserts = []  # Chroma writes not yet waited on; drained before the next recall
+
+logger = logging.getLogger(__name__)
+
+def _log_upsert_error(future) -> None:
+    """Done-callback for Chroma writes: a failed upsert is logged instead of vanishing with its future."""
+    exc = future.exception()
+    if exc is not None:
+        logger.error("Chroma upsert failed: %r", exc)
+
 # --- Agent state definition ---
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
-    memory_context: Annotated[List[str], list]
+    memory_context: List[str]  # Replaced every turn by memory_node
+    last_user: str  # Latest user input, set by the caller: no scan back through messages to find it
 
 # --- Initialize LLM ---
 llm = ChatOllama(model="llama3.2:3b", temperature=0)
@@ -53,9 +81,17 @@ llm = ChatOllama(model="llama3.2:3b", temperature=0)
 # --- Memory management helpers ---
 def _ns(config: RunnableConfig) -> tuple[str, ...]:
     """Get the user/app namespace for memory storage."""
-    user_id = config.get("configurable", {}).get("user_id", "anonymous")
+    return _ns_for_user(config.get("configurable", {}).get("user_id", "anonymous"))
+
+# The namespace tuple and its "a/b" string form depend only on the user id: build each once per user.
+@lru_cache(maxsize=1024)
+def _ns_for_user(user_id: str) -> tuple[str, ...]:
     return (user_id, "chatbot")
 
+@lru_cache(maxsize=1024)
+def _ns_path(ns: tuple[str, ...]) -> str:
+    return "/".join(ns)
+
 def ensure_profile(store: BaseStore, ns: tuple[str, ...]) -> None:
     """Ensure a user profile exists in structured memory."""
     if store.get(ns, "profile") is None:
@@ -64,17 +100,22 @@ def ensure_profile(store: BaseStore, ns: tuple[str, ...]) -> None:
             "preferences": ["short replies", "English", "Python"],
             "my-key": "my-value",
             "type": "profile",
-            "ns": "/".join(ns),
+            "ns": _ns_path(ns),
         })
 
+# Event keys: a random prefix drawn once per process plus a counter. The prefix keeps keys unique in the
+# persistent Chroma DB across restarts; the counter avoids drawing fresh randomness for every event.
+_EVENT_PREFIX = uuid.uuid4().hex[:8]
+_event_counter = itertools.count()
+
 def write_event(store: BaseStore, ns: tuple[str, ...], user_msg: str) -> str:
     """Write an episodic event to structured memory."""
-    key = f"event-{uuid.uuid4().hex[:8]}"
+    key = f"event-{_EVENT_PREFIX}-{next(_event_counter):06x}"
     value = {
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "interaction": user_msg,
         "type": "event",
-        "ns": "/".join(ns),
+        "ns": _ns_path(ns),
     }
     store.put(ns, key, value)
     return key
@@ -83,6 +124,7 @@ def upsert_chroma(ns: tuple[str, ...], key: str, text: str, metadata: dict) -> N
     """Upsert an event into Chroma vector DB for semantic search."""
     doc_id = "::".join((*ns, key))
     vector.upsert(ids=[doc_id], documents=[text], metadatas=[metadata])
+    _invalidate_sem_cache(ns)  # Cached recalls for this user no longer include every event
 
 def recall_from_store(store: BaseStore, ns: tuple[str, ...], query: str, limit: int = 3) -> List[str]:
     """Recall relevant memories from structured store using semantic search and filters."""
@@ -97,9 +139,11 @@ def recall_from_store(store: BaseStore, ns: tuple[str, ...], query: str, limit:
             out.append(f"Past event: {v['interaction']} at {v['timestamp']} (score={r.score})")
     return out
 
-def recall_from_chroma(ns: tuple[str, ...], query: str, k: int = 3) -> List[str]:
+def recall_from_chroma(ns: tuple[str, ...], query: str, k: int = 3, query_vector: Optional[List[float]] = None) -> List[str]:
     """Recall relevant memories from Chroma vector DB using semantic similarity."""
-    results = vector.similarity_search_with_score(query, k=k, filter={"ns": "/".join(ns)})
+    if query_vector is None:
+        query_vector = embeddings.embed_query(query)
+    results = vector.similarity_search_by_vector_with_relevance_scores(query_vector, k=k, filter={"ns": _ns_path(ns)})
     out: List[str] = []
     for doc, score in results:
         kind = (doc.metadata or {}).get("kind")
@@ -109,6 +153,42 @@ def recall_from_chroma(ns: tuple[str, ...], query: str, k: int = 3) -> List[str]
             out.append(f"{doc.page_content} (score={score:.3f})")
     return out
 
+# Semantic cache for Chroma recalls: (ns, k, unit query vector, snippets), oldest entries dropped first.
+# A new query whose embedding has cosine >= SEMANTIC_CACHE_THRESHOLD with a cached one reuses its snippets
+# and skips the Chroma search. The namespace is per user and shared by all of that user's threads, so
+# every completed upsert drops the namespace's entries: a cached recall never predates the latest event.
+# _sem_cache_gen counts those invalidations, so a search that raced with an upsert isn't cached afterwards.
+SEMANTIC_CACHE_THRESHOLD = 0.9
+_sem_cache = deque(maxlen=128)
+_sem_cache_gen = {}
+_sem_cache_lock = threading.Lock()  # upsert_chroma invalidates from the _chroma_writer thread
+
+def _invalidate_sem_cache(ns: tuple[str, ...]) -> None:
+    with _sem_cache_lock:
+        kept = [entry for entry in _sem_cache if entry[0] != ns]
+        _sem_cache.clear()
+        _sem_cache.extend(kept)
+        _sem_cache_gen[ns] = _sem_cache_gen.get(ns, 0) + 1
+
+def cached_recall_from_chroma(ns: tuple[str, ...], query: str, k: int = 3) -> List[str]:
+    """recall_from_chroma behind the semantic cache. The query is embedded once for both the lookup and the search."""
+    qvec = np.asarray(embeddings.embed_query(query), dtype=np.float32)
+    qvec /= np.linalg.norm(qvec) or 1.0  # Unit length: cosine similarity becomes a dot product
+    with _sem_cache_lock:
+        gen = _sem_cache_gen.get(ns, 0)
+        entries = [entry for entry in _sem_cache if entry[0] == ns and entry[1] == k]
+    if entries:
+        # One matrix-vector product scores the query against every cached vector
+        sims = np.stack([entry[2] for entry in entries]) @ qvec
+        best = int(np.argmax(sims))
+        if sims[best] >= SEMANTIC_CACHE_THRESHOLD:
+            return entries[best][3]
+    snips = recall_from_chroma(ns, query, k=k, query_vector=qvec.tolist())
+    with _sem_cache_lock:
+        if _sem_cache_gen.get(ns, 0) == gen:
+            _sem_cache.append((ns, k, qvec, snips))
+    return snips
+
 # --- Graph nodes ---
 def memory_node(state: AgentState, *, store: BaseStore, config: RunnableConfig) -> AgentState:
     """
@@ -118,16 +198,20 @@ def memory_node(state: AgentState, *, store: BaseStore, config: RunnableConfig)
     """
     ns = _ns(config)
     ensure_profile(store, ns)
-    last_human: Optional[HumanMessage] = None
-    for m in reversed(state["messages"]):
-        if isinstance(m, HumanMessage):
-            last_human = m
-            break
-    user_text = last_human.content if last_human else ""
+    user_text = state.get("last_user", "")
     key = write_event(store, ns, user_text)
-    upsert_chroma(ns, key, f"event: {user_text}", {"kind": "event", "ns": "/".join(ns)})
-    store_snips = recall_from_store(store, ns, user_text, limit=3)
-    chroma_snips = recall_from_chroma(ns, user_text, k=3)
+    # Let earlier turns' Chroma writes land first, so this recall can find them (errors are logged by the callback)
+    if _pending_upserts:
+        wait(_pending_upserts)
+        _pending_upserts.clear()
+    # The two recalls are independent (store search vs. Ollama embedding + Chroma query): run them concurrently
+    store_future = _recall_pool.submit(recall_from_store, store, ns, user_text, 3)
+    chroma_snips = cached_recall_from_chroma(ns, user_text, k=3)
+    store_snips = store_future.result()
+    # Index the new event in the background; the next memory_node call waits for it before recalling
+    future = _chroma_writer.submit(upsert_chroma, ns, key, f"event: {user_text}", {"kind": "event", "ns": _ns_path(ns)})
+    future.add_done_callback(_log_upsert_error)
+    _pending_upserts.append(future)
     return {"memory_context": store_snips + chroma_snips}
 
 def llm_chat_node(state: AgentState) -> AgentState:
@@ -167,6 +251,9 @@ if __name__ == "__main__":
         if user_input.lower() == "exit":
             break
         config = {"configurable": {"thread_id": "1", "user_id": "user-123"}}
-        result = agent.invoke({"messages": [HumanMessage(content=user_input)], "memory_context": []}, config=config)
+        result = agent.invoke(
+            {"messages": [HumanMessage(content=user_input)], "memory_context": [], "last_user": user_input},
+            config=config,
+        )
         if result and "messages" in result and result["messages"]:
             print("Assistant:", result["messages"][-1].content)
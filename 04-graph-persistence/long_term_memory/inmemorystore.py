@@ -1,6 +1,7 @@
 # Example: Using LangGraph's InMemoryStore for long-term memory with semantic search
 
 from typing import TypedDict, Sequence, Annotated, List, Optional
+import copy
 import uuid
 from datetime import datetime, timezone
 from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, AIMessage
@@ -8,24 +9,45 @@ from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 from langgraph.checkpoint.memory import InMemorySaver
-from langgraph.store.base import BaseStore
+from langgraph.store.base import BaseStore, GetOp, PutOp, SearchOp
 from langgraph.store.memory import InMemoryStore
 from langchain_ollama import ChatOllama, OllamaEmbeddings
 
 # You can use OllamaEmbeddings for semantic search in production:
 # embeddings = OllamaEmbeddings(model="llama3.2:3b")
-# store = InMemoryStore(index={"embed": embeddings.embed_documents, "dims": embeddings.dims})
+# store = InMemoryStore(index={"embed": memoize_embed(embeddings.embed_documents), "dims": embeddings.dims})
+
+def memoize_embed(embed_fn, maxsize: int = 1024):
+    """
+    Wrap a batch embed function so each distinct text is embedded once.
+    The store embeds every search query (and every indexed put); repeated texts, like a query that is
+    searched twice in one turn, reuse the stored vector and only the misses go to the model, in one call.
+    """
+    vectors: dict[str, list[float]] = {}
+
+    def embed(texts: list[str]) -> list[list[float]]:
+        # Answer from a per-call dict, so evicting the shared cache below can't drop a vector this call needs
+        batch = {t: vectors[t] for t in texts if t in vectors}
+        misses = [t for t in dict.fromkeys(texts) if t not in batch]
+        if misses:
+            batch.update(zip(misses, embed_fn(misses)))
+            if len(vectors) + len(misses) > maxsize:
+                vectors.clear()
+            vectors.update((t, batch[t]) for t in misses[:maxsize])
+        return [batch[t] for t in texts]
+
+    return embed
 
 # For demonstration, use a toy embedding function
 def embed(texts: list[str]) -> list[list[float]]:
     return [[float(i) for i in range(2)] for _ in texts]
 
 dims = 2
-store = InMemoryStore(index={"embed": embed, "dims": dims})
+store = InMemoryStore(index={"embed": memoize_embed(embed), "dims": dims})
 
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
-    memory_context: Annotated[List[str], list]
+    memory_context: List[str]  # Replaced every turn by memory_node
 
 llm = ChatOllama(model="llama3.2:3b", temperature=0)
 
@@ -35,24 +57,24 @@ def _user_ns(config: RunnableConfig) -> tuple[str, ...]:
     user_id = config.get("configurable", {}).get("user_id", "anonymous")
     return (user_id, "chatbot")
 
-def ensure_profile(store: BaseStore, ns: tuple[str, ...]) -> None:
-    if store.get(ns, "profile") is None:
-        store.put(ns, "profile", {
-            "name": "Alice",
-            "preferences": ["short replies", "English", "Python"],
-            "my-key": "my-value",
-            "type": "profile"
-        })
-
-def write_episodic_event(store: BaseStore, ns: tuple[str, ...], user_msg: str) -> None:
-    store.put(ns, f"event-{uuid.uuid4().hex[:8]}", {
+DEFAULT_PROFILE = {
+    "name": "Alice",
+    "preferences": ["short replies", "English", "Python"],
+    "my-key": "my-value",
+    "type": "profile"
+}
+
+def episodic_event_op(ns: tuple[str, ...], user_msg: str) -> PutOp:
+    return PutOp(ns, f"event-{uuid.uuid4().hex[:8]}", {
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "interaction": user_msg,
         "type": "event"
     })
 
-def recall_memories(store: BaseStore, ns: tuple[str, ...], query: str, limit: int = 3) -> list[str]:
-    results = store.search(ns, filter={"my-key": "my-value"}, query=query, limit=limit)
+def recall_op(ns: tuple[str, ...], query: str, limit: int = 3) -> SearchOp:
+    return SearchOp(ns, filter={"my-key": "my-value"}, limit=limit, query=query)
+
+def format_memories(results) -> list[str]:
     snippets = []
     for r in results:
         val = r.value
@@ -67,15 +89,28 @@ def recall_memories(store: BaseStore, ns: tuple[str, ...], query: str, limit: in
 
 def memory_node(state: AgentState, *, store: BaseStore, config: RunnableConfig) -> AgentState:
     ns = _user_ns(config)
-    ensure_profile(store, ns)
-    last_human: Optional[HumanMessage] = None
-    for m in reversed(state["messages"]):
-        if isinstance(m, HumanMessage):
-            last_human = m
-            break
+    # add_messages appends, so the turn's HumanMessage is normally the last one: check it first (O(1))
+    # and only scan back through the history when something else was appended after it
+    msgs = state["messages"]
+    last = msgs[-1] if msgs else None
+    last_human: Optional[HumanMessage] = (
+        last if isinstance(last, HumanMessage)
+        else next((m for m in reversed(msgs) if isinstance(m, HumanMessage)), None)
+    )
     user_text = last_human.content if last_human else ""
-    write_episodic_event(store, ns, user_text)
-    memory_context = recall_memories(store, ns, user_text, limit=3)
+    # NOTE: One store.batch() call instead of get + put + search: a single round-trip on PostgresStore.
+    # Puts in a batch are applied after its reads, so the search sees memories from earlier turns only.
+    profile, _, results = store.batch([
+        GetOp(ns, "profile"),
+        episodic_event_op(ns, user_text),
+        recall_op(ns, user_text, limit=3),
+    ])
+    if profile is None:
+        # First turn for this user only: create the profile, then re-run the search so it can be recalled
+        # Each user gets their own copy (preferences list included), never the shared module-level dict
+        store.put(ns, "profile", copy.deepcopy(DEFAULT_PROFILE))
+        results = store.batch([recall_op(ns, user_text, limit=3)])[0]
+    memory_context = format_memories(results)
     return {"memory_context": memory_context}
 
 def llm_chat_node(state: AgentState) -> AgentState:
@@ -113,9 +148,16 @@ if __name__ == "__main__":
                 "user_id": "user-123"
             }
         }
-        result = agent.invoke({"messages": [HumanMessage(content=user_input)], "memory_context": []}, config=config)
-        if result and "messages" in result and result["messages"]:
-            print("Assistant:", result["messages"][-1].content)
+        # Print the chat node's tokens as they are generated instead of waiting for the full reply
+        print("Assistant: ", end="", flush=True)
+        for chunk, metadata in agent.stream(
+            {"messages": [HumanMessage(content=user_input)], "memory_context": []},
+            config=config,
+            stream_mode="messages",
+        ):
+            if metadata.get("langgraph_node") == "chat" and chunk.content:
+                print(chunk.content, end="", flush=True)
+        print()
 
 # Recommended pattern
 # LangGraph Store for structured long-term memory (PostgresStore in prod).
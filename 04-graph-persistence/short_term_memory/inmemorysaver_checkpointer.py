@@ -17,16 +17,19 @@ class AgentState(TypedDict):
 # Initialize the LLM (Ollama)
 llm = ChatOllama(model="llama3.2:3b", temperature=0)
 
+# The system prompt never changes, so build the message once instead of on every turn
+SYSTEM_CHAT = SystemMessage(
+    content="You are a helpful assistant. Help the user with their questions and summarize their requests."
+)
+
 def llm_chat_node(state: AgentState) -> AgentState:
     """
-    Adds a system prompt, invokes the LLM, and appends the response to the state.
+    Adds a system prompt, invokes the LLM, and returns the response as a partial update.
     """
-    system_prompt = SystemMessage(
-        content="You are a helpful assistant. Help the user with their questions and summarize their requests."
-    )
-    response = llm.invoke([system_prompt] + state["messages"])
-    state["messages"].append(response)
-    return state
+    response = llm.invoke([SYSTEM_CHAT, *state["messages"]])
+    # NOTE: Return only the new message. Returning the whole (mutated) state makes add_messages
+    # re-merge every message by id on each turn, and the checkpoint state is never mutated in place.
+    return {"messages": [response]}
 
 # Build the workflow graph
 workflow_build = StateGraph(AgentState)
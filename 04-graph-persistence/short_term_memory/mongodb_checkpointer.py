@@ -1,5 +1,5 @@
-from typing import Any, Dict, Optional, Sequence, Annotated
-from pymongo import MongoClient
+from typing import Any, Dict, List, Optional, Sequence, Annotated
+from pymongo import DESCENDING, MongoClient
 from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import StateGraph, START, END
 from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
@@ -15,9 +15,13 @@ class MongoDBCheckpointSaver(BaseCheckpointSaver):
     """
     def __init__(self, uri: str, db_name: str = "langgraph", collection_name: str = "checkpoints"):
         # Connect to MongoDB and select database/collection
-        self.client = MongoClient(uri)
+        # Compress wire traffic (zstd if the zstandard package is installed, else zlib) and retry transient write errors
+        self.client = MongoClient(uri, retryWrites=True, compressors="zstd,zlib")
         self.db = self.client[db_name]
         self.collection = self.db[collection_name]
+        # Compound index: per-thread lookups become an index seek instead of a collection scan,
+        # and "newest first" (_id descending) is read straight off the index without an in-memory sort
+        self.collection.create_index([("config.thread_id", 1), ("_id", DESCENDING)])
 
     def put(self, config: Dict[str, Any], metadata: Dict[str, Any], values: Dict[str, Any], next_nodes: Any, tasks: Any) -> str:
         """
@@ -33,6 +37,16 @@ class MongoDBCheckpointSaver(BaseCheckpointSaver):
         result = self.collection.insert_one(checkpoint)
         return str(result.inserted_id)
 
+    def put_many(self, checkpoints: List[Dict[str, Any]]) -> List[str]:
+        """
+        Save many checkpoints in one round-trip (e.g. when replaying or importing history).
+        ordered=False lets the server write them in parallel and keep going past a failed document.
+        """
+        if not checkpoints:
+            return []
+        result = self.collection.insert_many(checkpoints, ordered=False)
+        return [str(inserted_id) for inserted_id in result.inserted_ids]
+
     def get_tuple(self, config: Dict[str, Any], checkpoint_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
         Retrieve a checkpoint by thread_id and optional checkpoint_id.
@@ -40,15 +54,17 @@ class MongoDBCheckpointSaver(BaseCheckpointSaver):
         query = {"config.thread_id": config.get("thread_id")}
         if checkpoint_id:
             query["_id"] = checkpoint_id
-        checkpoint = self.collection.find_one(query)
+        # Newest first, so without a checkpoint_id this returns the latest checkpoint of the thread
+        checkpoint = self.collection.find_one(query, sort=[("_id", DESCENDING)])
         return checkpoint
 
-    def list(self, config: Dict[str, Any]) -> list:
+    def list(self, config: Dict[str, Any], limit: int = 0) -> list:
         """
-        List all checkpoints for a given thread_id.
+        List checkpoints for a given thread_id, newest first (limit=0 means all).
         """
         query = {"config.thread_id": config.get("thread_id")}
-        return list(self.collection.find(query))
+        cursor = self.collection.find(query).sort("_id", DESCENDING).limit(limit).batch_size(100)
+        return list(cursor)
 
     def delete_thread(self, thread_id: str) -> int:
         """
@@ -65,14 +81,16 @@ class AgentState(TypedDict):
 # Initialize the LLM (Ollama)
 llm = ChatOllama(model="llama3.2:3b", temperature=0)
 
+# Constant system prompt, created once at import
+SYSTEM_CHAT = SystemMessage(
+    content="You are a helpful assistant. Help the user with their questions and summarize their requests."
+)
+
 def llm_chat_node(state: AgentState) -> AgentState:
     """
     Adds a system prompt, invokes the LLM, and appends the response to the state.
     """
-    system_prompt = SystemMessage(
-        content="You are a helpful assistant. Help the user with their questions and summarize their requests."
-    )
-    response = llm.invoke([system_prompt] + state["messages"])
+    response = llm.invoke([SYSTEM_CHAT, *state["messages"]])
     state["messages"].append(response)
     return state
 
@@ -6,6 +6,7 @@ Demonstrates how to use ToolNode in LangGraph to enable an agent to call tools f
 ToolNode manages tool execution, error handling, and message passing in the graph.
 """
 
+import asyncio
 from typing import TypedDict, Sequence, Annotated
 from langchain_core.messages import HumanMessage, ToolMessage, BaseMessage, SystemMessage
 from langchain_ollama import ChatOllama
@@ -13,7 +14,7 @@ from langgraph.graph import StateGraph, START, END
 from langgraph.prebuilt import ToolNode
 from langchain_core.tools import tool
 from langgraph.graph.message import add_messages
-import requests
+from http_tools import HTTP, LLM_SEM, http_get, json_loads, geocode, fetch_users_text
 
 class AgentState(TypedDict):
     """Agent state containing a list of messages."""
@@ -26,33 +27,30 @@ def add(a: int, b: int) -> int:
     return a + b
 
 @tool
-def get_weather(city: str) -> str:
+async def get_weather(city: str) -> str:
     """Get the current temperature in Celsius for a given city."""
     # Example tool: fetches weather data from an external API
     try:
-        geo_resp = requests.get(f"https://geocoding-api.open-meteo.com/v1/search?name={city}")
-        geo = geo_resp.json()
-        if not geo.get("results"):
+        coords = await geocode(city)
+        if coords is None:
             return f"City '{city}' not found."
-        lat = geo["results"][0]["latitude"]
-        lon = geo["results"][0]["longitude"]
-        weather_resp = requests.get(
-            f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current_weather=true"
+        lat, lon = coords
+        weather_resp = await http_get(
+            "https://api.open-meteo.com/v1/forecast",
+            params={"latitude": lat, "longitude": lon, "current_weather": "true"},
         )
-        weather = weather_resp.json()
+        weather = json_loads(weather_resp.content)
         temp = weather["current_weather"]["temperature"]
         return f"The current temperature in {city} is {temp}°C."
     except Exception as e:
         return f"Error fetching weather: {e}"
 
 @tool
-def get_users() -> str:
+async def get_users() -> str:
     """Fetch 10 users from JSONPlaceholder API."""
     # Example tool: fetches user data from an external API
     try:
-        users_resp = requests.get("https://jsonplaceholder.typicode.com/users")
-        users = users_resp.json()
-        return "\n".join([f"{u['id']}: {u['name']} ({u['email']})" for u in users[:10]])
+        return await fetch_users_text()
     except Exception as e:
         return f"Error fetching users: {e}"
 
@@ -63,24 +61,24 @@ tool_list = [add, get_weather, get_users]
 # Bind tools to the LLM so it can call them when needed
 llm = ChatOllama(model="llama3.2:3b", temperature=0).bind_tools(tool_list)
 
-# Node that processes messages with the LLM and appends the response
-def llm_processor_node(state: AgentState) -> AgentState:
+# The system prompt is constant, so it is created once at import rather than on every LLM turn
+SYSTEM_PROMPT = SystemMessage(
+    content="You are an AI assistant. Use tools for math, weather, or user data queries."
+)
+
+# Node that processes messages with the LLM and returns the response as a state update
+async def llm_processor_node(state: AgentState) -> AgentState:
     """Process messages with LLM and append the response to state."""
-    system_prompt = SystemMessage(
-        content="You are an AI assistant. Use tools for math, weather, or user data queries."
-    )
-    response = llm.invoke([system_prompt] + state["messages"])
-    state["messages"].append(response)
-    return state
+    async with LLM_SEM:
+        response = await llm.ainvoke([SYSTEM_PROMPT, *state["messages"]])
+    # Only the new message: add_messages appends it, with no in-place mutation or full-history merge
+    return {"messages": [response]}
 
 
 # Node that decides whether to continue (call a tool) or end
 def should_continue_node(state: AgentState) -> str:
     """Return 'continue' if the last message requests a tool, else 'end'."""
-    last_message = state["messages"][-1]
-    if hasattr(last_message, "tool_calls") and last_message.tool_calls:
-        return "continue"
-    return "end"
+    return "continue" if getattr(state["messages"][-1], "tool_calls", None) else "end"
 
 # Build the graph
 graph = StateGraph(AgentState)
@@ -111,12 +109,19 @@ graph.add_edge("tool_nodes", "llm_processor_node")
 # Compile the graph into an executable agent
 app = graph.compile()
 
-def print_stream(stream):
+async def print_stream(stream):
     """Prints each message from the agent stream."""
-    for s in stream:
+    async for s in stream:
         message = s["messages"][-1]
         print(getattr(message, "content", message))
 
-if __name__ == "__main__":
+async def main():
     inputs = {"messages": [HumanMessage(content="Add 40 + 12 and then multiply the result by 6. Also tell me a joke please.")]}
-    print_stream(app.stream(inputs, stream_mode="values"))
\ No newline at end of file
+    try:
+        # LLM node, ToolNode and the HTTP tools are all async: astream runs them on one event loop
+        await print_stream(app.astream(inputs, stream_mode="values"))
+    finally:
+        await HTTP.aclose()  # Release the shared client's connections
+
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
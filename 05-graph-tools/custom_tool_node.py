@@ -1,10 +1,12 @@
+import asyncio
+from functools import lru_cache
 from typing import TypedDict, Sequence, Annotated
 from langchain_core.messages import HumanMessage, ToolMessage, BaseMessage, SystemMessage
 from langchain_core.tools import tool
-from langchain_ollama import ChatOllama
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
-import requests
+from langgraph.types import StreamWriter
+from http_tools import HTTP, LLM_SEM, http_get, json_loads, geocode, fetch_users_text
 
 class AgentState(TypedDict):
     """Agent state containing a list of messages exchanged during the conversation."""
@@ -18,40 +20,61 @@ def add(a: int, b: int) -> int:
     return a + b
 
 @tool
-def get_weather(city: str) -> str:
+async def get_weather(city: str) -> str:
     """Get the current temperature in Celsius for a given city using Open-Meteo API."""
     try:
-        geo_resp = requests.get(f"https://geocoding-api.open-meteo.com/v1/search?name={city}")
-        geo = geo_resp.json()
-        if not geo.get("results"):
+        coords = await geocode(city)
+        if coords is None:
             return f"City '{city}' not found."
-        lat = geo["results"][0]["latitude"]
-        lon = geo["results"][0]["longitude"]
-        weather_resp = requests.get(
-            f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current_weather=true"
+        lat, lon = coords
+        weather_resp = await http_get(
+            "https://api.open-meteo.com/v1/forecast",
+            params={"latitude": lat, "longitude": lon, "current_weather": "true"},
         )
-        weather = weather_resp.json()
+        weather = json_loads(weather_resp.content)
         temp = weather["current_weather"]["temperature"]
         return f"The current temperature in {city} is {temp}°C."
     except Exception as e:
         return f"Error fetching weather: {e}"
 
 @tool
-def get_users() -> str:
+async def get_users() -> str:
     """Fetch 10 users from JSONPlaceholder API."""
     try:
-        users_resp = requests.get("https://jsonplaceholder.typicode.com/users")
-        users = users_resp.json()
-        return "\n".join([f"{u['id']}: {u['name']} ({u['email']})" for u in users[:10]])
+        return await fetch_users_text()
     except Exception as e:
         return f"Error fetching users: {e}"
 
 
 # Tool Binding
 tool_list = [add, get_weather, get_users]
-llm = ChatOllama(model="llama3.2:3b", temperature=0).bind_tools(tool_list)
+
+@lru_cache(maxsize=1)
+def _get_llm():
+    """
+    Build the tool-bound chat model on first use.
+    langchain_ollama (and the ollama client under it) is only imported when the LLM node first runs,
+    so importing this module for its tools or graph doesn't pay for it.
+    """
+    from langchain_ollama import ChatOllama
+    return ChatOllama(model="llama3.2:3b", temperature=0).bind_tools(tool_list)
+
 tools_dict = {tool.name: tool for tool in tool_list}
 
+# Trusted, cheap local tools called as plain functions when the arguments already have the declared types:
+# skips BaseTool.invoke's Pydantic validation and callback setup, which cost far more than a + b itself.
+FAST_DISPATCH = {add.name: add.func}
+
+def _fast_args_ok(func, args: dict) -> bool:
+    """True if args has exactly the function's parameters, each already of its annotated type."""
+    params = {name: typ for name, typ in func.__annotations__.items() if name != "return"}
+    return args.keys() == params.keys() and all(isinstance(args[name], typ) for name, typ in params.items())
+
+# Constant system prompt, built once instead of on every LLM turn
+SYSTEM_PROMPT = SystemMessage(
+    content="You are an AI assistant. Use tools for math, weather, or user data queries."
+)
+
 
 """
 Custom tool execution node.
@@ -66,46 +89,62 @@ This manually handles tool calls from the LLM's response and returns ToolMessage
     - Custom tool routing
 """
 # Custom Tool Execution Node
-def tool_node(state: AgentState) -> AgentState:
+async def _run_tool(t) -> str:
+    """Run one tool call; errors come back as text for the LLM."""
+    tool_name = t['name']
+    tool = tools_dict.get(tool_name)  # one dict lookup; unknown tools never reach the try block
+    if tool is None:
+        return f"Tool '{tool_name}' does not exist."
+    args = t.get('args') or {}
+    try:
+        fast = FAST_DISPATCH.get(tool_name)
+        if fast is not None and _fast_args_ok(fast, args):
+            return fast(**args)
+        # Pass the full argument dict: add(a, b) needs both kwargs, not a single 'query' string.
+        # ainvoke awaits async tools directly and runs sync ones (like add) in a worker thread
+        return await tool.ainvoke(args)
+    except Exception as e:
+        return f"Error executing tool '{tool_name}': {e}"
+
+async def tool_node(state: AgentState, writer: StreamWriter) -> AgentState:
     """
     Executes tool calls from the LLM's response and returns results as ToolMessages.
     Handles missing tools and execution errors gracefully.
+    When the LLM asks for several tools in one turn they run concurrently, so the turn
+    takes as long as the slowest tool instead of the sum of all of them.
+    Each result is also pushed to the "custom" stream the moment its tool finishes,
+    so callers see fast tools without waiting for the slowest one.
     """
     tool_calls = state['messages'][-1].tool_calls
-    results = []
-    for t in tool_calls:
-        tool_name = t['name']
-        args = t.get('args', {})
-        query = args.get('query', '')  # fallback for tools expecting 'query'
-        if tool_name not in tools_dict:
-            result = f"Tool '{tool_name}' does not exist."
-        else:
-            try:
-                result = tools_dict[tool_name].invoke(query)
-            except Exception as e:
-                result = f"Error executing tool '{tool_name}': {e}"
-        results.append(ToolMessage(tool_call_id=t['id'], name=tool_name, content=str(result)))
+
+    async def run(i, t):
+        return i, await _run_tool(t)
+
+    outputs = [None] * len(tool_calls)
+    for finished in asyncio.as_completed([run(i, t) for i, t in enumerate(tool_calls)]):
+        i, result = await finished
+        outputs[i] = result  # slot by index, so the ToolMessages below keep the tool-call order
+        writer({"tool": tool_calls[i]['name'], "result": str(result)})
+    results = [
+        ToolMessage(tool_call_id=t['id'], name=t['name'], content=str(result))
+        for t, result in zip(tool_calls, outputs)
+    ]
     return {'messages': results}
 
 
 # LLM Processor Node
-def llm_processor_node(state: AgentState) -> AgentState:
-    """Processes messages with the LLM and appends the response to the state."""
-    system_prompt = SystemMessage(
-        content="You are an AI assistant. Use tools for math, weather, or user data queries."
-    )
-    response = llm.invoke([system_prompt] + state["messages"])
-    state["messages"].append(response)
-    return state
+async def llm_processor_node(state: AgentState) -> AgentState:
+    """Processes messages with the LLM and returns the response for add_messages to append."""
+    async with LLM_SEM:
+        response = await _get_llm().ainvoke([SYSTEM_PROMPT, *state["messages"]])
+    return {"messages": [response]}
 
 
 # Conditional Node
 def should_continue_node(state: AgentState) -> str:
     """Decides whether to continue with tool execution or end the graph."""
-    last_message = state["messages"][-1]
-    if hasattr(last_message, "tool_calls") and last_message.tool_calls:
-        return "continue"
-    return "end"
+    # getattr with a default: one attribute lookup, and no AttributeError path for messages without tool_calls
+    return "continue" if getattr(state["messages"][-1], "tool_calls", None) else "end"
 
 
 # Graph Construction
@@ -126,14 +165,25 @@ app = graph.compile()
 
 
 # Stream Output Helper
-def print_stream(stream):
-    """Prints each message from the agent stream."""
-    for s in stream:
+async def print_stream(stream):
+    """Prints each message from the agent stream, plus tool results as soon as each tool finishes."""
+    async for mode, s in stream:
+        if mode == "custom":
+            print(f"[{s['tool']} done] {s['result']}")
+            continue
         message = s["messages"][-1]
         print(getattr(message, "content", message))
 
 
 # Entry Point
-if __name__ == "__main__":
+async def main():
     inputs = {"messages": [HumanMessage(content="let list of 5 user in a table format")]}
-    print_stream(app.stream(inputs, stream_mode="values"))
+    try:
+        # Every node is async, so the whole run stays on one event loop
+        await print_stream(app.astream(inputs, stream_mode=["values", "custom"]))
+    finally:
+        await HTTP.aclose()  # Close pooled connections before the loop shuts down
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+# http_tools.py
+# Shared HTTP plumbing for the tool examples in this folder (build_in_tool_node.py, custom_tool_node.py):
+# one pooled async client, the concurrency caps, and the geocoding / user-list caches.
+
+import asyncio
+import time
+from collections import OrderedDict
+from itertools import islice
+import httpx
+
+# Optional faster JSON decoding: orjson parses the raw response bytes directly; falls back to the stdlib
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# One shared async HTTP client for the network tools: awaiting it never blocks the event loop,
+# so concurrent tool calls really overlap, and its keep-alive pool is reused across calls.
+HTTP = httpx.AsyncClient(
+    timeout=httpx.Timeout(10.0, connect=3.0),
+    limits=httpx.Limits(max_keepalive_connections=10, max_connections=20),
+    transport=httpx.AsyncHTTPTransport(retries=2),  # Retry failed connection attempts
+)
+
+# Concurrency caps: at most TOOL_CONCURRENCY outbound HTTP requests and LLM_CONCURRENCY model calls
+# in flight, so parallel tool calls can't flood the public APIs or oversubscribe the local Ollama server.
+TOOL_CONCURRENCY = 16
+LLM_CONCURRENCY = 4
+TOOL_SEM = asyncio.Semaphore(TOOL_CONCURRENCY)
+LLM_SEM = asyncio.Semaphore(LLM_CONCURRENCY)
+
+async def http_get(url: str, **kwargs) -> httpx.Response:
+    """GET through the shared client, holding a TOOL_SEM slot for the duration of the request."""
+    async with TOOL_SEM:
+        return await HTTP.get(url, **kwargs)
+
+# city (lowercased) -> (lat, lon) or None, least recently used first. City coordinates never change,
+# so repeat cities skip the geocoding round-trip; the oldest entry is dropped past GEOCODE_CACHE_SIZE.
+GEOCODE_CACHE_SIZE = 1024
+_geocode_cache = OrderedDict()
+# The demo user list doesn't change; reuse the formatted answer for USERS_TTL seconds
+USERS_TTL = 300
+_users_cache = []  # [expires_at, text] once filled
+
+async def geocode(city: str):
+    """Return (lat, lon) for a city, or None if Open-Meteo doesn't know it."""
+    key = city.strip().lower()
+    if key in _geocode_cache:
+        _geocode_cache.move_to_end(key)
+        return _geocode_cache[key]
+    geo_resp = await http_get("https://geocoding-api.open-meteo.com/v1/search", params={"name": city})
+    geo_resp.raise_for_status()  # Don't cache 429/5xx responses as "city not found"
+    results = json_loads(geo_resp.content).get("results")
+    _geocode_cache[key] = (results[0]["latitude"], results[0]["longitude"]) if results else None
+    if len(_geocode_cache) > GEOCODE_CACHE_SIZE:
+        _geocode_cache.popitem(last=False)
+    return _geocode_cache[key]
+
+async def fetch_users_text() -> str:
+    """Return the first 10 JSONPlaceholder users as 'id: name (email)' lines, cached for USERS_TTL."""
+    if _users_cache and _users_cache[0] > time.monotonic():
+        return _users_cache[1]
+    users_resp = await http_get("https://jsonplaceholder.typicode.com/users")
+    users_resp.raise_for_status()
+    users = json_loads(users_resp.content)
+    text = "\n".join(f"{u['id']}: {u['name']} ({u['email']})" for u in islice(users, 10))
+    _users_cache[:] = [time.monotonic() + USERS_TTL, text]
+    return text
@@ -1,4 +1,6 @@
 import asyncio
+import sys
+import time
 from typing import TypedDict, Sequence
 from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
 from langchain_ollama import ChatOllama
@@ -8,64 +10,108 @@ from langchain_core.tools import tool
 from langgraph.graph.message import add_messages
 from langchain_mcp_adapters.client import MultiServerMCPClient
 
+# Optional: uvloop (libuv-based event loop) lowers per-task and per-socket overhead for the many small
+# streaming reads. Not available on Windows, so fall back to the default asyncio loop.
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 class AgentState(TypedDict):
     messages: Sequence[BaseMessage]
 
+# Built once and reused on every LLM call
+SYSTEM_PROMPT = SystemMessage(
+    content="You are an AI assistant. Use tools for math, weather, or user data queries."
+)
+
 # Configure MultiServerMCPClient to connect to multiple tool servers.
-# Each server is started as a subprocess using stdio for communication.
+# Each server runs as its own long-lived process over streamable HTTP, so the client connects
+# instead of spawning (and re-importing) a subprocess per server on every run. Start them first:
+#   python 06-graph-mcp/servers/api_server.py        # http://127.0.0.1:8001/mcp
+#   python 06-graph-mcp/servers/mongodb_server.py    # http://127.0.0.1:8002/mcp
+#   python 06-graph-mcp/servers/internal_server.py   # http://127.0.0.1:8003/mcp
 # The dictionary keys are server names used for tool loading.
 client = MultiServerMCPClient({
     "mongodb": {
-        "command": "python",
-        "args": ["graph_mcp/servers/mongodb_server.py"],
-        "transport": "stdio",
+        "url": "http://127.0.0.1:8002/mcp",
+        "transport": "streamable_http",
     },
     "openapi": {
-        "command": "python",
-        "args": ["graph_mcp/servers/api_server.py"],
-        "transport": "stdio",
+        "url": "http://127.0.0.1:8001/mcp",
+        "transport": "streamable_http",
     },
     "internal": {
-        "command": "python",
-        "args": ["graph_mcp/servers/internal_server.py"],
-        "transport": "stdio",
+        "url": "http://127.0.0.1:8003/mcp",
+        "transport": "streamable_http",
     },
 })
 
 
-async def main():
+class StreamWriter:
+    """
+    Buffers streamed tokens and writes them to stdout in batches (every `max_items` tokens or `max_delay` seconds),
+    instead of one write + flush per token.
+    """
+    def __init__(self, max_items: int = 16, max_delay: float = 0.05):
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self.buffer = []
+        self.last_flush = time.monotonic()
+
+    def write(self, text: str):
+        self.buffer.append(text)
+        if len(self.buffer) >= self.max_items or "\n" in text or time.monotonic() - self.last_flush >= self.max_delay:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            sys.stdout.write("".join(self.buffer))
+            self.buffer.clear()
+        sys.stdout.flush()
+        self.last_flush = time.monotonic()
+
+
+async def build_app():
+    """
+    One-time setup: load MCP tools, bind them to the LLM and compile the graph.
+    Returns the compiled app, or None if no tools could be loaded.
+    """
     # List of servers to load tools from
     server_names = ["openapi", "internal", "mongodb"]
     tools = []
 
-    # Load tools from each server with error handling
-    for name in server_names:
-        try:
-            server_tools = await client.get_tools(server_name=name)
-            tools.extend(server_tools)
-            print(f"✅ Loaded tools from '{name}': {[t.name for t in server_tools]}")
-        except Exception as e:
-            print(f"❌ Failed to load tools from '{name}': {e}")
+    # Load tools from all servers concurrently: startup waits for the slowest server, not the sum of all.
+    # return_exceptions=True keeps one failing server from cancelling the others.
+    results = await asyncio.gather(
+        *(asyncio.wait_for(client.get_tools(server_name=name), timeout=10) for name in server_names),
+        return_exceptions=True,
+    )
+    for name, result in zip(server_names, results):
+        if isinstance(result, Exception):
+            print(f"❌ Failed to load tools from '{name}': {result!r}")
+            continue
+        tools.extend(result)
+        print(f"✅ Loaded tools from '{name}': {[t.name for t in result]}")
 
     # Exit if no tools were loaded
     if not tools:
         print("🚨 No tools loaded. Exiting.")
-        return
+        return None
 
-    llm = ChatOllama(model="llama3.2:3b", temperature=0, streaming=True).bind_tools(tools)
+    # keep_alive keeps the weights loaded between turns (Ollama unloads after ~5 min idle by default);
+    # a fixed num_ctx stops the server from reloading the model when the context size changes.
+    llm = ChatOllama(model="llama3.2:3b", temperature=0, streaming=True, keep_alive="24h", num_ctx=4096).bind_tools(tools)
 
     # LLM Node
     async def llm_processor_node(state: AgentState) -> AgentState:
-        system_prompt = SystemMessage(
-            content="You are an AI assistant. Use tools for math, weather, or user data queries."
-        )
-        response = await llm.ainvoke([system_prompt] + state["messages"])
+        response = await llm.ainvoke([SYSTEM_PROMPT, *state["messages"]])
         state["messages"].append(response)
         return state
 
     async def should_continue_node(state: AgentState) -> str:
-        last_message = state["messages"][-1]
-        return "continue" if getattr(last_message, "tool_calls", None) else "end"
+        # Only reached after llm_processor_node, so the last message is an AIMessage with a tool_calls list
+        return "continue" if state["messages"][-1].tool_calls else "end"
 
 
     graph = StateGraph(AgentState)
@@ -81,9 +127,14 @@ async def main():
     graph.add_edge("tool_nodes", "llm_processor_node")
 
     # Compile the graph into an executable app
-    app = graph.compile()
+    return graph.compile()
 
 
+async def serve(app):
+    """
+    Interactive loop over an already-built app: every question reuses the same tools, LLM client and graph,
+    so the setup cost in build_app() is paid once per process, not per query.
+    """
     print("💬 Type 'exit' to quit.")
     while True:
         user_input = input("User: ")
@@ -94,28 +145,47 @@ async def main():
         input_state = {"messages": [HumanMessage(content=user_input)]}
         print("📡 Streaming events...\n")
 
-        # Stream events from the graph execution
+        # Stream the graph execution. "messages" yields LLM tokens, "updates" yields each node's output once it finishes.
+        # Cheaper than astream_events, which builds a full event dict (run_id, parent_ids, metadata) for every token.
+        out = StreamWriter()
         try:
-            async for event in app.astream_events(input=input_state, version="v2"):
-                kind = event["event"]
-                name = event.get("name")
-
-                # Handle different event types
-                if kind == "on_chat_model_stream":
-                    chunk = event["data"]["chunk"]
-                    if chunk and chunk.content:
-                        print(chunk.content, end="", flush=True)
-                elif kind == "on_tool_start":
-                    tool_input = event["data"].get("input")
-                    print(f"\n🛠️ Tool start: {name} | input: {tool_input}")
-                elif kind == "on_tool_end":
-                    tool_output = event["data"].get("output")
-                    print(f"\n✅ Tool end: {name} | output: {tool_output}")
-                elif kind == "on_chain_end":
-                    print()
+            async for mode, chunk in app.astream(input_state, stream_mode=["messages", "updates"]):
+                if mode == "messages":
+                    message, metadata = chunk
+                    # Only print tokens coming from the LLM node (tool results are reported below)
+                    if metadata.get("langgraph_node") == "llm_processor_node" and message.content:
+                        out.write(message.content)
+                    continue
+
+                # mode == "updates": {node_name: node_output}
+                for node_name, update in chunk.items():
+                    messages = update.get("messages") if update else None
+                    if not messages:
+                        continue
+                    out.flush()
+                    if node_name == "llm_processor_node":
+                        # The LLM asked for tools: report each call before the tool node runs
+                        for tool_call in getattr(messages[-1], "tool_calls", None) or ():
+                            print(f"\n🛠️ Tool start: {tool_call['name']} | input: {tool_call['args']}")
+                        print()
+                    elif node_name == "tool_nodes":
+                        for tool_message in messages:
+                            print(f"\n✅ Tool end: {tool_message.name} | output: {tool_message.content}")
         except Exception as e:
+            out.flush()
             print(f"⚠️ Error during streaming: {e}")
+        out.flush()
+
+
+async def main():
+    app = await build_app()
+    if app is None:
+        return
+    await serve(app)
 
 # Run the async main function using asyncio
 if __name__ == "__main__":
-    asyncio.run(main())
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
@@ -1,29 +1,56 @@
 from langchain_core.tools import tool
 from langchain_mcp_adapters.tools import to_fastmcp
 from mcp.server.fastmcp import FastMCP
-import requests
+from collections import OrderedDict
+from itertools import islice
+import httpx
+
+# One pooled async client for every tool: keep-alive reuses TCP/TLS connections across tool calls,
+# and async tools let the MCP server handle several tool calls at once instead of tying up a thread per call.
+CLIENT = httpx.AsyncClient(
+    timeout=httpx.Timeout(10.0, connect=3.05),
+    limits=httpx.Limits(max_keepalive_connections=10, max_connections=20),
+    transport=httpx.AsyncHTTPTransport(retries=3),  # Retries failed connection attempts
+)
 
 @tool
-def call_openapi(endpoint: str, method: str = "GET", params: dict = None, data: dict = None) -> str:
+async def call_openapi(endpoint: str, method: str = "GET", params: dict = None, data: dict = None) -> str:
     """Call an OpenAPI endpoint with the given method, params, and data."""
     try:
-        response = requests.request(method, endpoint, params=params, json=data)
+        response = await CLIENT.request(method, endpoint, params=params, json=data)
         return response.text
     except Exception as e:
         return f"OpenAPI error: {e}"
 
+# city -> (latitude, longitude) or None, least recently used first. City coordinates don't change,
+# so each city is geocoded once; the oldest entry is dropped past GEOCODE_CACHE_SIZE.
+GEOCODE_CACHE_SIZE = 1024
+_geocode_cache = OrderedDict()
+
+async def _geocode(city: str):
+    """Return (latitude, longitude) for a city, or None if unknown."""
+    if city in _geocode_cache:
+        _geocode_cache.move_to_end(city)
+        return _geocode_cache[city]
+    geo_resp = await CLIENT.get("https://geocoding-api.open-meteo.com/v1/search", params={"name": city})
+    geo_resp.raise_for_status()  # Don't cache 429/5xx responses as "city not found"
+    results = geo_resp.json().get("results")
+    _geocode_cache[city] = (results[0]["latitude"], results[0]["longitude"]) if results else None
+    if len(_geocode_cache) > GEOCODE_CACHE_SIZE:
+        _geocode_cache.popitem(last=False)
+    return _geocode_cache[city]
+
 @tool
-def get_weather(city: str) -> str:
+async def get_weather(city: str) -> str:
     """Get the current temperature in Celsius for a given city using Open-Meteo API."""
     try:
-        geo_resp = requests.get(f"https://geocoding-api.open-meteo.com/v1/search?name={city}")
-        geo = geo_resp.json()
-        if not geo.get("results"):
+        coords = await _geocode(city.strip().lower())
+        if coords is None:
             return f"City '{city}' not found."
-        lat = geo["results"][0]["latitude"]
-        lon = geo["results"][0]["longitude"]
-        weather_resp = requests.get(
-            f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current_weather=true"
+        lat, lon = coords
+        weather_resp = await CLIENT.get(
+            "https://api.open-meteo.com/v1/forecast",
+            params={"latitude": lat, "longitude": lon, "current_weather": "true"},
         )
         weather = weather_resp.json()
         temp = weather["current_weather"]["temperature"]
@@ -32,15 +59,17 @@ def get_weather(city: str) -> str:
         return f"Error fetching weather: {e}"
 
 @tool
-def get_users() -> str:
+async def get_users() -> str:
     """Fetch 10 users from JSONPlaceholder API."""
     try:
-        users_resp = requests.get("https://jsonplaceholder.typicode.com/users")
+        users_resp = await CLIENT.get("https://jsonplaceholder.typicode.com/users")
         users = users_resp.json()
-        return "\n".join([f"{u['id']}: {u['name']} ({u['email']})" for u in users[:10]])
+        # Generator + islice: no temporary list, and iteration stops after the first 10 users
+        return "\n".join(f"{u['id']}: {u['name']} ({u['email']})" for u in islice(users, 10))
     except Exception as e:
         return f"Error fetching users: {e}"
 
 fastmcp_tools = [to_fastmcp(call_openapi), to_fastmcp(get_weather), to_fastmcp(get_users)]
-mcp = FastMCP("OpenAPI", tools=fastmcp_tools)
-mcp.run(transport="stdio")
+# Long-running HTTP service: clients reuse this process (and its warm imports/connection pool) instead of spawning it per run
+mcp = FastMCP("OpenAPI", tools=fastmcp_tools, host="127.0.0.1", port=8001)
+mcp.run(transport="streamable-http")
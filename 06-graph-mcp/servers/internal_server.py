@@ -15,9 +15,9 @@ def greet(name: str) -> str:
 # Wrap functions as FastMCP tools
 fastmcp_tools = [to_fastmcp(multiply), to_fastmcp(greet)]
 
-# Create and start the MCP server with stdio transport (local communication)
-mcp = FastMCP("InternalTools", tools=fastmcp_tools)
+# Create and start the MCP server as a long-running streamable HTTP service
+mcp = FastMCP("InternalTools", tools=fastmcp_tools, host="127.0.0.1", port=8003)
 
-# Using "stdio" transport is recommended for local communication, especially when integrating with subprocesses.
-# It allows the server to communicate via standard input/output, which is simple and efficient for local tools.
-mcp.run(transport="stdio")
+# "stdio" makes every client launch spawn this server as a subprocess and re-import its dependencies.
+# "streamable-http" keeps one server process running that any number of client runs can connect to.
+mcp.run(transport="streamable-http")
@@ -68,6 +68,6 @@ fastmcp_tools = [
     to_fastmcp(create_and_save_product)
 ]
 
-# Create and run the MCP server using stdio transport
-mcp = FastMCP("MongoDB", tools=fastmcp_tools)
-mcp.run(transport="stdio")
+# Create and run the MCP server as a long-running streamable HTTP service
+mcp = FastMCP("MongoDB", tools=fastmcp_tools, host="127.0.0.1", port=8002)
+mcp.run(transport="streamable-http")
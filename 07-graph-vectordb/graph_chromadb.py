@@ -2,6 +2,7 @@
 from langchain.schema import Document
 from langchain_ollama import OllamaEmbeddings
 import chromadb
+import numpy as np
 
 # Prepare documents
 docs = [
@@ -38,25 +39,52 @@ texts = [doc.page_content for doc in docs]
 metadatas = [doc.metadata for doc in docs]
 ids = [f"doc-{i+1}" for i in range(len(docs))]
 
-# Generate embeddings
 embedder = OllamaEmbeddings(model=EMBED_MODEL)
-embeddings = embedder.embed_documents(texts)
 
-# Create ChromaDB client and collection
-client = chromadb.Client()
-collection = client.create_collection(name="demo_collection")
+def embed_all(texts):
+    """
+    Embed every text in one Ollama request (one round-trip instead of one per call site).
+    Vectors come back unit-length, so inner product equals cosine similarity
+    (an all-zero vector is left as is instead of dividing by zero).
+    """
+    vectors = np.asarray(embedder.embed_documents(texts), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.where(norms == 0, 1.0, norms)).tolist()
 
-# Add documents to collection
-collection.add(
-    documents=texts,
-    metadatas=metadatas,
-    ids=ids,
-    embeddings=embeddings
-)
+# Create a persistent ChromaDB client and collection: the vectors survive between runs
+client = chromadb.PersistentClient(path="./.chroma")
+# all-minilm is trained for cosine similarity (Chroma defaults to L2). The vectors are normalized
+# in embed_all, so plain inner-product space gives the cosine ranking without per-query normalization;
+# the HNSW graph parameters are set explicitly for its 384-dim vectors instead of relying on defaults.
+# The embedding model is recorded too: vectors from another model must not be mixed into the same index.
+COLLECTION_NAME = "demo_collection"
+INDEX_METADATA = {"hnsw:space": "ip", "hnsw:M": 16, "hnsw:construction_ef": 100, "hnsw:search_ef": 64, "embed_model": EMBED_MODEL}
+collection = client.get_or_create_collection(name=COLLECTION_NAME, metadata=INDEX_METADATA)
+# get_or_create_collection keeps an existing collection's original settings (e.g. an older run's L2 space).
+# If they don't match, drop it and rebuild, so a warm start never queries with the wrong metric.
+if any((collection.metadata or {}).get(key) != value for key, value in INDEX_METADATA.items()):
+    client.delete_collection(COLLECTION_NAME)
+    collection = client.create_collection(name=COLLECTION_NAME, metadata=INDEX_METADATA)
 
-# Query the collection
+# Only documents that aren't stored yet need embedding (none on a warm start)
+existing = set(collection.get(ids=ids, include=[])["ids"])
+new_idx = [i for i, doc_id in enumerate(ids) if doc_id not in existing]
+
+# Generate embeddings for the new documents and the query together
+# (all-minilm has no separate query/document prefix, so embed_query and embed_documents give the same vector)
 query = "What are the gym's operating hours?"
-query_embedding = embedder.embed_query(query)
+*embeddings, query_embedding = embed_all([texts[i] for i in new_idx] + [query])
+
+# Add the new documents to the collection
+if new_idx:
+    collection.add(
+        documents=[texts[i] for i in new_idx],
+        metadatas=[metadatas[i] for i in new_idx],
+        ids=[ids[i] for i in new_idx],
+        embeddings=embeddings
+    )
+
+# Query the collection
 result = collection.query(
     query_embeddings=[query_embedding],
     n_results=2
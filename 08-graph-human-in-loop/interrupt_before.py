@@ -1,12 +1,17 @@
 from langgraph.graph import StateGraph, START, END, add_messages
 from typing import TypedDict, Annotated, List
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite import SqliteSaver
 from langgraph.prebuilt import ToolNode
 from langchain_core.messages import HumanMessage
 from langchain_core.tools import tool
 from langchain_ollama import ChatOllama
+import sqlite3
+import uuid
 
-memory = MemorySaver()
+# SqliteSaver keeps checkpoints in a file instead of an ever-growing in-memory dict,
+# so a paused thread survives a restart and old versions don't pile up in RAM.
+conn = sqlite3.connect("interrupt_before.db", check_same_thread=False)
+memory = SqliteSaver(conn)
 
 document_content = ""  
 
@@ -32,7 +37,8 @@ def save(filename: str) -> str:
 tools = [save]
 
 # Initialize the LLM and bind tools for tool calling
-llm = ChatOllama(model="llama3.2:3b", temperature=0).bind_tools(tools=tools)
+# Keep the model resident while the human reviews the tool call (keep_alive)
+llm = ChatOllama(model="llama3.2:3b", temperature=0, keep_alive="24h", num_ctx=4096).bind_tools(tools=tools)
 
 # Define the state structure for the graph
 class BasicState(TypedDict):
@@ -51,13 +57,10 @@ def model(state: BasicState):
 def tools_router(state: BasicState):
     """
     Checks if the last message contains tool calls.
-    If so, routes to the 'tools' node; otherwise, ends the workflow.
+    If so, routes to the 'tool_node' node; otherwise, ends the workflow.
     """
-    last_message = state["messages"][-1]
-    if hasattr(last_message, "tool_calls") and len(last_message.tool_calls) > 0:
-        return "tools"
-    else:
-        return END
+    # The last message comes from the model node (an AIMessage), so tool_calls is always a list
+    return "tool_node" if state["messages"][-1].tool_calls else END
 
 # Build the workflow graph
 graph = StateGraph(BasicState)
@@ -77,8 +80,10 @@ graph.add_edge("tool_node", "model")  # Loop back to model after tool execution
 app = graph.compile(checkpointer=memory, interrupt_before=["tool_node"])
 
 # Configuration for thread persistence
+# A fresh thread ID per run: the database outlives the process, and reusing an ID would
+# continue a thread left paused before 'tool_node' by an earlier run instead of starting clean.
 config = {"configurable": {
-    "thread_id": 1
+    "thread_id": str(uuid.uuid4())
 }}
 
 # Start the workflow with an initial human message
@@ -1,13 +1,15 @@
 from langgraph.graph import StateGraph, END, add_messages
 from langgraph.types import Command, interrupt
 from typing import TypedDict, Annotated, List
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite import SqliteSaver
 from langchain_ollama import ChatOllama
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+import sqlite3
 import uuid
 
 # Initialize the LLM (Ollama)
-llm = ChatOllama(model="llama3.2:3b", temperature=0)
+# keep_alive: feedback rounds can take minutes; don't let Ollama unload the model in between
+llm = ChatOllama(model="llama3.2:3b", temperature=0, keep_alive="24h", num_ctx=4096)
 
 # Define the state structure for the workflow
 class State(TypedDict):
@@ -82,7 +84,9 @@ graph.add_edge("human_node", "model")
 graph.set_finish_point("end_node")
 
 # Enable persistence and interrupt mechanism
-checkpointer = MemorySaver()
+# SqliteSaver stores each checkpoint on disk instead of keeping every version in memory.
+conn = sqlite3.connect("multiturn.db", check_same_thread=False)
+checkpointer = SqliteSaver(conn)
 app = graph.compile(checkpointer=checkpointer)
 
 thread_config = {"configurable": {"thread_id": str(uuid.uuid4())}}
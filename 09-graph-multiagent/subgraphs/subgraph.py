@@ -22,11 +22,8 @@ def agent(state: ChildState):
     }
 
 def tools_router(state: ChildState):
-    last_message = state["messages"][-1]
-    if hasattr(last_message, "tool_calls") and len(last_message.tool_calls) > 0:
-        return "tool_node"
-    else:
-        return END
+    # Only reached after the agent node, so the last message is an AIMessage with a tool_calls list
+    return "tool_node" if state["messages"][-1].tool_calls else END
 
 tool_node = ToolNode(tools=tools)
 
@@ -1,8 +1,11 @@
 import os
+import time
+import hashlib
+from collections import OrderedDict
 from typing import Literal
 from pydantic import BaseModel, Field
 
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_tavily import TavilySearch
 from langchain_ollama import ChatOllama
 from langchain_experimental.tools import PythonREPLTool
@@ -14,6 +17,9 @@ from langgraph.prebuilt import create_react_agent
 # Set API keys and model configuration
 os.environ["TAVILY_API_KEY"] = "your_tavily_api_key_here"
 llm = ChatOllama(model="llama3.2:3b", temperature=0)
+# Routing decisions (supervisor/validator) only need a label and a one-sentence reason:
+# num_predict caps the decode length so a rambling reason can't cost hundreds of tokens.
+router_llm = ChatOllama(model="llama3.2:3b", temperature=0, num_predict=128)
 tavily_search = TavilySearch(max_results=2)
 python_repl_tool = PythonREPLTool()
 
@@ -23,9 +29,75 @@ class Supervisor(BaseModel):
         description="Which specialist to activate next: 'enhancer', 'researcher', or 'coder'."
     )
     reason: str = Field(
-        description="Justification for the routing decision."
+        description="One-sentence justification for the routing decision."
     )
 
+# Structured-output runnables are built once: the JSON schema is generated from the model here,
+# not on every supervisor/validator call.
+# method="json_schema" passes the schema as Ollama's `format`: decoding is grammar-constrained to valid JSON
+# with `next` limited to the Literal values, instead of free text that is parsed (and may fail) afterwards.
+supervisor_router = router_llm.with_structured_output(Supervisor, method="json_schema")
+
+# System prompts are built once at module level. Each node sends [system prompt, *history]:
+# the history is only ever appended to, so every call starts with a byte-identical prefix
+# and Ollama can reuse the KV cache of the part it has already processed.
+SUPERVISOR_SYSTEM = SystemMessage(content=(
+    "You are a workflow supervisor managing three agents: Enhancer, Researcher, and Coder. "
+    "Choose the next agent based on the current state.\n"
+    "Enhancer: Clarifies and improves queries.\n"
+    "Researcher: Gathers facts and context.\n"
+    "Coder: Implements solutions and performs computations.\n"
+    "Always provide a clear rationale for your choice."
+))
+ENHANCER_SYSTEM = SystemMessage(content=(
+    "You are a Query Refinement Specialist. Improve and clarify the user's query. "
+    "Do not ask questions back; make reasonable assumptions and produce a precise, actionable request."
+))
+
+RESEARCH_SYSTEM = SystemMessage(content=(
+    "You are an Information Specialist. Gather relevant, accurate, and up-to-date information. "
+    "Organize findings clearly and cite sources when possible."
+))
+CODE_SYSTEM = SystemMessage(content=(
+    "You are a coder and analyst. Focus on calculations, code execution, and technical problem-solving."
+))
+
+# The specialist ReAct agents are compiled once here and reused on every call.
+# `prompt` prepends the system message inside the agent, so the nodes pass the history as-is.
+research_agent = create_react_agent(llm, tools=[tavily_search], prompt=RESEARCH_SYSTEM)
+code_agent = create_react_agent(llm, tools=[python_repl_tool], prompt=CODE_SYSTEM)
+
+# Routing cache: a supervisor decision is reused only when the conversation it was made from comes back unchanged.
+# hash of every message so far (names and contents, including what the specialists returned) -> (created_at, next, reason).
+# Least recently used first: at most PLAN_CACHE_SIZE entries, and entries older than PLAN_CACHE_TTL seconds are purged.
+PLAN_CACHE_TTL = 3600.0
+PLAN_CACHE_SIZE = 256
+_plan_cache: "OrderedDict[str, tuple[float, str, str]]" = OrderedDict()
+
+def _route_key(messages) -> str:
+    """Hash of the state a routing decision depends on: the full message history, in order."""
+    digest = hashlib.blake2b(digest_size=16)
+    for m in messages:
+        digest.update(f"{m.name or ''}\0{m.content}\0".encode())
+    return digest.hexdigest()
+
+def _cached_route(key: str):
+    """Return the cached (next, reason) for this state, or None. Expired entries are dropped on the way."""
+    now = time.monotonic()
+    for stale in [k for k, (created_at, _, _) in _plan_cache.items() if now - created_at > PLAN_CACHE_TTL]:
+        del _plan_cache[stale]
+    entry = _plan_cache.get(key)
+    if entry is None:
+        return None
+    _plan_cache.move_to_end(key)
+    return entry[1], entry[2]
+
+def _store_route(key: str, goto: str, reason: str) -> None:
+    _plan_cache[key] = (time.monotonic(), goto, reason)
+    _plan_cache.move_to_end(key)
+    if len(_plan_cache) > PLAN_CACHE_SIZE:
+        _plan_cache.popitem(last=False)
+
 # ------------------- NODE DEFINITIONS FOR MULTI-AGENT GRAPH -------------------
 
 def supervisor_node(state: MessagesState) -> Command[Literal["enhancer", "researcher", "coder"]]:
@@ -34,20 +106,16 @@ def supervisor_node(state: MessagesState) -> Command[Literal["enhancer", "resear
     Uses a system prompt to instruct the LLM to choose between Enhancer, Researcher, or Coder,
     and provide a rationale for the choice.
     """
-    system_prompt = (
-        "You are a workflow supervisor managing three agents: Enhancer, Researcher, and Coder. "
-        "Choose the next agent based on the current state.\n"
-        "Enhancer: Clarifies and improves queries.\n"
-        "Researcher: Gathers facts and context.\n"
-        "Coder: Implements solutions and performs computations.\n"
-        "Always provide a clear rationale for your choice."
-    )
-    messages = [
-        {"role": "system", "content": system_prompt},
-    ] + state["messages"]
-    response = llm.with_structured_output(Supervisor).invoke(messages)
-    goto = response.next
-    reason = response.reason
+    key = _route_key(state["messages"])
+    cached = _cached_route(key)
+    if cached is not None:
+        goto, reason = cached
+    else:
+        messages = [SUPERVISOR_SYSTEM, *state["messages"]]
+        response = supervisor_router.invoke(messages)
+        goto = response.next
+        reason = response.reason
+        _store_route(key, goto, reason)
     return Command(
         update={
             "messages": [HumanMessage(content=reason, name="supervisor")]
@@ -60,13 +128,7 @@ def enhancer_node(state: MessagesState) -> Command[Literal["supervisor"]]:
     Enhancer node: Refines and clarifies the user's query.
     Uses a system prompt to instruct the LLM to improve the query without asking questions back.
     """
-    system_prompt = (
-        "You are a Query Refinement Specialist. Improve and clarify the user's query. "
-        "Do not ask questions back; make reasonable assumptions and produce a precise, actionable request."
-    )
-    messages = [
-        {"role": "system", "content": system_prompt},
-    ] + state["messages"]
+    messages = [ENHANCER_SYSTEM, *state["messages"]]
     enhanced_query = llm.invoke(messages)
     return Command(
         update={
@@ -80,20 +142,7 @@ def research_node(state: MessagesState) -> Command[Literal["validator"]]:
     Researcher node: Gathers relevant information and context.
     Uses a system prompt and the TavilySearch tool to collect and organize findings.
     """
-    research_prompt = (
-        "You are an Information Specialist. Gather relevant, accurate, and up-to-date information. "
-        "Organize findings clearly and cite sources when possible."
-    )
-    research_agent = create_react_agent(
-        llm,
-        tools=[tavily_search]
-    )
-    # Prepend system prompt to messages
-    state_with_prompt = state.copy()
-    state_with_prompt["messages"] = [
-        {"role": "system", "content": research_prompt}
-    ] + state["messages"]
-    result = research_agent.invoke(state_with_prompt)
+    result = research_agent.invoke({"messages": state["messages"]})
     return Command(
         update={
             "messages": [HumanMessage(content=result["messages"][-1].content, name="researcher")]
@@ -106,19 +155,7 @@ def code_node(state: MessagesState) -> Command[Literal["validator"]]:
     Coder node: Performs calculations, code execution, and technical problem-solving.
     Uses a system prompt and the PythonREPLTool for code-related tasks.
     """
-    code_prompt = (
-        "You are a coder and analyst. Focus on calculations, code execution, and technical problem-solving."
-    )
-    code_agent = create_react_agent(
-        llm,
-        tools=[python_repl_tool]
-    )
-    # Prepend system prompt to messages
-    state_with_prompt = state.copy()
-    state_with_prompt["messages"] = [
-        {"role": "system", "content": code_prompt}
-    ] + state["messages"]
-    result = code_agent.invoke(state_with_prompt)
+    result = code_agent.invoke({"messages": state["messages"]})
     return Command(
         update={
             "messages": [HumanMessage(content=result["messages"][-1].content, name="coder")]
@@ -132,15 +169,18 @@ validator_prompt = (
     "If the answer is good enough, signal to end the workflow with 'FINISH'. "
     "Only route back to supervisor if the answer is completely off-topic or harmful."
 )
+VALIDATOR_SYSTEM = SystemMessage(content=validator_prompt)
 
 class Validator(BaseModel):
     next: Literal["supervisor", "FINISH"] = Field(
         description="Next step: 'supervisor' to continue, 'FINISH' to end."
     )
     reason: str = Field(
-        description="Reason for the decision."
+        description="One-sentence reason for the decision."
     )
 
+validator_router = router_llm.with_structured_output(Validator, method="json_schema")
+
 def validator_node(state: MessagesState) -> Command[Literal["supervisor", "__end__"]]:
     """
     Validator node: Reviews the agent's answer and decides whether to end the workflow or route back to supervisor.
@@ -149,11 +189,11 @@ def validator_node(state: MessagesState) -> Command[Literal["supervisor", "__end
     user_question = state["messages"][0].content
     agent_answer = state["messages"][-1].content
     messages = [
-        {"role": "system", "content": validator_prompt},
+        VALIDATOR_SYSTEM,
         {"role": "user", "content": user_question},
         {"role": "assistant", "content": agent_answer},
     ]
-    response = llm.with_structured_output(Validator).invoke(messages)
+    response = validator_router.invoke(messages)
     goto = response.next
     reason = response.reason
     if goto == "FINISH":
@@ -183,8 +223,10 @@ inputs = {
     ]
 }
 
-# Stream workflow execution and print updates from each node
-for event in app.stream(inputs):
+# Stream workflow execution and print updates from each node.
+# stream_mode="updates" yields only each node's delta ({node: {"messages": [new message]}}), not the full history.
+# No early break is needed on FINISH: the validator's Command(goto=END) already ends the run.
+for event in app.stream(inputs, stream_mode="updates"):
     for node, state in event.items():
         if state is None:
             continue
@@ -1,11 +1,14 @@
 import logging
-from typing import List, TypedDict, Any, Dict, Optional
-from langchain_core.messages import BaseMessage, HumanMessage
-from langchain_core.messages.utils import count_tokens_approximately
+import sqlite3
+import uuid
+from typing import Annotated, List, TypedDict, Any, Dict, Optional
+from langchain_core.messages import BaseMessage, HumanMessage, RemoveMessage
 from langchain_ollama import ChatOllama
 from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph.message import add_messages, REMOVE_ALL_MESSAGES
+from langgraph.checkpoint.sqlite import SqliteSaver
 from langmem.short_term import SummarizationNode
+from token_cache import cached_token_counter
 
 logging.basicConfig(
     level=logging.INFO,
@@ -14,11 +17,20 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class AgentState(TypedDict):
-    messages: List[BaseMessage]
+    # add_messages lets llm_node return only the new message instead of the whole history
+    messages: Annotated[List[BaseMessage], add_messages]
+
 
 def get_llm(model_name: str = "llama3.2:3b", temperature: float = 0) -> ChatOllama:
-    """Factory for LLM instance."""
-    return ChatOllama(model=model_name, temperature=temperature)
+    """
+    Factory for LLM instance. main() builds it once and shares it between the summarizer and llm_node.
+    keep_alive keeps the weights loaded between turns; a fixed num_ctx avoids a model reload on context changes.
+    """
+    return ChatOllama(model=model_name, temperature=temperature, keep_alive="24h", num_ctx=4096)
+
+
+# Token budget for the history passed to the LLM; summarization only kicks in above it
+MAX_TOKENS = 384
 
 
 # Summarizer builder
@@ -32,9 +44,9 @@ def build_summarization_node(llm: ChatOllama) -> SummarizationNode:
     This example keeps `llm_input_messages` to demonstrate safe adaptation.
     """
     return SummarizationNode(
-        token_counter=count_tokens_approximately,
+        token_counter=cached_token_counter,
         model=llm,
-        max_tokens=384,
+        max_tokens=MAX_TOKENS,
         max_summary_tokens=128,
         output_messages_key="llm_input_messages",
         # If available in your version, you can also set:
@@ -50,13 +62,21 @@ def summarization_adapter_node(summarizer: SummarizationNode):
 
     Behavior:
       - If no messages in state -> pass-through (no summarization).
+      - If the history fits in MAX_TOKENS -> pass-through (nothing to summarize).
       - Else -> run summarizer; then map its output back to state["messages"].
+    Pass-throughs return an empty update ({}), so add_messages doesn't re-merge the whole history.
     """
     def _node(state: AgentState) -> AgentState:
         messages: List[BaseMessage] = state.get("messages", [])
         if not messages:
             logger.info("No messages in state; skipping summarization and passing through.")
-            return state
+            return {}
+
+        # Short histories fit the budget anyway: skip the summarizer call entirely.
+        # cached_token_counter makes this a dict lookup per already-seen message.
+        if cached_token_counter(messages) <= MAX_TOKENS:
+            logger.info("History within token budget; skipping summarization.")
+            return {}
 
         # Call the summarizer with the state. Depending on the SummarizationNode contract,
         # it may look at `messages` by default or need an input key (already provided above).
@@ -64,7 +84,7 @@ def summarization_adapter_node(summarizer: SummarizationNode):
             out: Dict[str, Any] = summarizer.invoke(state)
         except Exception as e:
             logger.error(f"SummarizationNode failed: {e}. Passing through original messages.")
-            return state
+            return {}
 
         # Prefer the configured output key, fallback to "messages" or original messages.
         trimmed: Optional[List[BaseMessage]] = (
@@ -73,8 +93,10 @@ def summarization_adapter_node(summarizer: SummarizationNode):
             or messages
         )
 
-        # Return state with normalized key
-        return AgentState(messages=trimmed)
+        # Return state with normalized key.
+        # REMOVE_ALL_MESSAGES clears the channel first, so the summarized list replaces the history
+        # instead of being merged into it by add_messages.
+        return AgentState(messages=[RemoveMessage(id=REMOVE_ALL_MESSAGES), *trimmed])
 
     return _node
 
@@ -84,12 +106,12 @@ def llm_node_factory(llm: ChatOllama):
         """LLM node for graph execution."""
         try:
             response = llm.invoke(state["messages"])
-            state["messages"].append(response)
             logger.info("LLM response appended to state.")
         except Exception as e:
             logger.error(f"Error in llm_node: {e}")
             raise
-        return state
+        # Return only the new message as a delta; add_messages appends it
+        return {"messages": [response]}
     return llm_node
 
 
@@ -126,6 +148,8 @@ def print_stream(stream: Any) -> None:
             # msgs = update.get("messages") or update.get("llm_input_messages") or []
             msgs = update.get("messages", [])
             for message in msgs:
+                if isinstance(message, RemoveMessage):
+                    continue
                 if isinstance(message, tuple):
                     print(message)
                 else:
@@ -137,10 +161,13 @@ def print_stream(stream: Any) -> None:
 
 def main() -> None:
     """Main entrypoint for running the agent interactively."""
-    config: Dict[str, Any] = {"configurable": {"thread_id": "1"}}
+    # New thread per run, so a chat doesn't resume an earlier run's history from summarization.db
+    config: Dict[str, Any] = {"configurable": {"thread_id": str(uuid.uuid4())}}
     llm_instance = get_llm()
     graph = build_graph(llm_instance)
-    app = graph.compile(checkpointer=InMemorySaver())
+    # Checkpoints go to a SQLite file instead of an in-memory dict that keeps every version of a long chat.
+    conn = sqlite3.connect("summarization.db", check_same_thread=False)
+    app = graph.compile(checkpointer=SqliteSaver(conn))
 
     print("🤖 LangGraph Agent is running. Type 'exit' or 'quit' to stop.\n")
     while True:
@@ -0,0 +1,33 @@
+# token_cache.py
+# Cached token counting shared by trimming.py and summarization.py.
+# Both scripts re-count the whole history before every LLM call; with this cache each message is
+# counted once and later turns reuse its count, keyed by message ID.
+
+from collections import OrderedDict
+from langchain_core.messages.utils import count_tokens_approximately
+
+# message ID -> (content, tokens), least recently used first; the oldest entry is dropped past the limit
+TOKEN_CACHE_SIZE = 4096
+_token_cache = OrderedDict()
+
+def cached_token_counter(messages) -> int:
+    """
+    Approximate token count for `messages`, reusing earlier counts by message ID.
+    A cached count is only used when the stored content equals the message's current content,
+    so a message replaced under the same ID is counted again.
+    """
+    total = 0
+    for msg in messages:
+        cached = _token_cache.get(msg.id) if msg.id else None
+        if cached is not None and cached[0] == msg.content:
+            _token_cache.move_to_end(msg.id)
+            total += cached[1]
+            continue
+        tokens = count_tokens_approximately([msg])
+        if msg.id:
+            _token_cache[msg.id] = (msg.content, tokens)
+            _token_cache.move_to_end(msg.id)
+            if len(_token_cache) > TOKEN_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+        total += tokens
+    return total
@@ -1,41 +1,48 @@
-from typing import List, TypedDict
-from langchain_core.messages import BaseMessage, HumanMessage
-from langchain_core.messages.utils import trim_messages, count_tokens_approximately
+from typing import Annotated, List, TypedDict
+from langchain_core.messages import BaseMessage, HumanMessage, RemoveMessage
+from langchain_core.messages.utils import trim_messages
 from langchain_ollama import ChatOllama
 from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph.message import add_messages, REMOVE_ALL_MESSAGES
+from langgraph.checkpoint.sqlite import SqliteSaver
+import sqlite3
+import uuid
+from token_cache import cached_token_counter
 
 class AgentState(TypedDict):
-    messages: List[BaseMessage]
-
+    # add_messages lets nodes return only what changed (and gives every message an ID for the token cache)
+    messages: Annotated[List[BaseMessage], add_messages]
 
 
 # NOTE:
 # The function uses `trim_messages` to reduce the message history based on token count.
 #     - Trimming strategy is set to "last", meaning the most recent messages are kept.
 #     - Only messages between "human" and "tool" roles are considered for trimming.
-#     - The `count_tokens_approximately` function is used to estimate token usage.
+#     - The `count_tokens_approximately` function (cached per message) is used to estimate token usage.
 #     - The maximum allowed tokens after trimming is 384.
 def pre_model_hook(state: AgentState) -> dict:
     trimmed_messages = trim_messages(
         state["messages"],
         strategy="last",
-        token_counter=count_tokens_approximately,
+        token_counter=cached_token_counter,
         max_tokens=384,
         start_on="human",
         end_on=("human", "tool"),
     )
     return {"messages": trimmed_messages}
 
-llm = ChatOllama(model="llama3.2:3b", temperature=0)
+# Pinned keep_alive/num_ctx: no model reload between turns
+llm = ChatOllama(model="llama3.2:3b", temperature=0, keep_alive="24h", num_ctx=4096)
 
 def trim_messages_node(state: AgentState) -> AgentState:
-    return pre_model_hook(state)
+    # With the add_messages reducer, returning the trimmed list would just merge it into the history.
+    # REMOVE_ALL_MESSAGES clears the channel first, so the trimmed list replaces it.
+    trimmed_messages = pre_model_hook(state)["messages"]
+    return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), *trimmed_messages]}
 
 def llm_node(state: AgentState) -> AgentState:
-    response = llm.invoke(state["messages"])
-    state["messages"].append(response)
-    return state
+    # Return only the new message as a delta; add_messages appends it
+    return {"messages": [llm.invoke(state["messages"])]}
 
 graph = StateGraph(AgentState)
 
@@ -46,13 +53,17 @@ graph.add_edge(START, "trim_messages")
 graph.add_edge("trim_messages", "llm_node")
 graph.add_edge("llm_node", END)
 
-app = graph.compile(checkpointer=InMemorySaver())
+# Checkpoints go to a SQLite file instead of an in-memory dict that keeps every version of a long chat.
+conn = sqlite3.connect("trimming.db", check_same_thread=False)
+app = graph.compile(checkpointer=SqliteSaver(conn))
 
 def print_stream(stream):
     for chunk in stream:
         for node, update in chunk.items():
             print(f"Update from node: {node}")
             for message in update.get("messages", []):
+                if isinstance(message, RemoveMessage):
+                    continue
                 if isinstance(message, tuple):
                     print(message)
                 else:
@@ -60,7 +71,8 @@ def print_stream(stream):
         print("\n\n")
 
 if __name__ == "__main__":
-    config = {"configurable": {"thread_id": "1"}}
+    # New thread per run, so a chat doesn't resume an earlier run's history from trimming.db
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
     print("🤖 LangGraph Agent is running. Type 'exit' or 'quit' to stop.\n")
     while True:
         user_input = input("You: ")
@@ -14,6 +14,7 @@ vector_retriever = vectorstore.as_retriever(
 
 # --- Initialize BM25 Retriever ---
 # Uses keyword-based BM25 algorithm for document retrieval.
+# Built from the chunk texts in the Parquet sidecar; nothing is unpickled from the store directory.
 documents = getattr(vectorstore, '_original_documents', None)
 if not documents:
     raise RuntimeError(
@@ -29,6 +30,14 @@ hybrid_retriever = EnsembleRetriever(
     weights=[0.7, 0.3]  # 70% vector, 30% BM25
 )
 
+# --- Warm-up ---
+def warm_up():
+    """
+    One throwaway query that loads the HNSW index, the embedding model and BM25's tables,
+    so the first real query doesn't pay for it. Opt-in: importing this module makes no Ollama call.
+    """
+    hybrid_retriever.invoke("stock market")
+
 def run_search(query: str):
     """Runs the query through vector, BM25, and hybrid retrievers and prints results."""
     print(f"\nQuery: {query}\n")
@@ -54,4 +63,5 @@ def run_search(query: str):
 if __name__ == "__main__":
     # Example query for demonstration
     query = "Provide a summary of the stock market performance in 2024."
+    warm_up()
     run_search(query)
\ No newline at end of file
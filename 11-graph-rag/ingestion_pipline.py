@@ -1,9 +1,22 @@
 import os
+import json
+import hashlib
+import sqlite3
+from contextlib import closing
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.documents import Document
 from langchain_chroma import Chroma
 from langchain_ollama import OllamaEmbeddings
 from langchain_community.document_loaders import PyPDFLoader
+from models import get_embedder
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
+# Cosine space plus an explicit query-time beam width (search_ef), so the recall/latency trade-off is visible
+COLLECTION_METADATA = {"hnsw:space": "cosine", "hnsw:search_ef": 64}
+
 def ensure_directory_exists(path: str) -> bool:
     """Ensure the given directory exists, create if not."""
     try:
@@ -13,39 +26,147 @@ def ensure_directory_exists(path: str) -> bool:
         print(f"❌ Failed to create directory '{path}': {e}")
         return False
 
-def load_pdf_chunks(pdf_path: str, chunk_size: int = 1500, chunk_overlap: int = 250):
-    """Load and split PDF into text chunks."""
+def load_pdf_pages(pdf_path: str):
+    """Load the PDF as one Document per page."""
     if not os.path.isfile(pdf_path):
         print(f"❌ PDF file not found: {pdf_path}")
         return None
     try:
-        loader = PyPDFLoader(pdf_path)
-        pages = loader.load()
+        pages = PyPDFLoader(pdf_path).load()
         print(f"✅ PDF loaded. Pages: {len(pages)}")
-        splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-        chunks = splitter.split_documents(pages)
-        print(f"✅ Text chunks created: {len(chunks)}")
-        return chunks
+        return pages
     except Exception as e:
         print(f"❌ Error processing PDF: {e}")
         return None
 
-def create_chroma_vectorstore(chunks, persist_dir: str, embedding_model: str = "all-minilm"):
+def split_pages(pages, chunk_size: int = 1500, chunk_overlap: int = 250):
+    """Split page Documents into text chunks (each chunk keeps its page's metadata)."""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks = splitter.split_documents(pages)
+    print(f"✅ Text chunks created: {len(chunks)}")
+    return chunks
+
+def load_pdf_chunks(pdf_path: str, chunk_size: int = 1500, chunk_overlap: int = 250):
+    """Load and split PDF into text chunks."""
+    pages = load_pdf_pages(pdf_path)
+    if pages is None:
+        return None
+    return split_pages(pages, chunk_size, chunk_overlap)
+
+def page_hashes(pages) -> dict:
+    """Page index -> sha256 of its text; the manifest that incremental ingestion diffs against."""
+    return {str(i): hashlib.sha256(page.page_content.encode()).hexdigest() for i, page in enumerate(pages)}
+
+def file_sha256(path: str) -> str:
+    """sha256 of the file's bytes: lets a warm start skip PDF parsing when the file is unchanged."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def save_manifest(persist_dir: str, pdf_hash: str, hashes: dict):
+    """Write the whole-file hash and the per-page hashes of the ingested PDF."""
+    with open(os.path.join(persist_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"pdf_sha256": pdf_hash, "pages": hashes}, f)
+
+def load_manifest(persist_dir: str) -> dict:
+    path = os.path.join(persist_dir, "manifest.json")
+    if not os.path.isfile(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def chunk_ids(chunks):
+    """Stable ids of the form page<N>-<k>, so one page's chunks can be replaced without touching the others."""
+    counters = {}
+    ids = []
+    for chunk in chunks:
+        page = chunk.metadata.get("page", 0)
+        counters[page] = counters.get(page, -1) + 1
+        ids.append(f"page{page}-{counters[page]}")
+    return ids
+
+def batch_embed(texts, embeddings: OllamaEmbeddings, batch_size: int = 64, max_workers: int = 4):
+    """
+    Embed texts in explicit batches: one Ollama /api/embed request per `batch_size` texts.
+    Bounds the request size for large PDFs (and lets you tune it per hardware) instead of one giant request.
+    Up to `max_workers` batches are in flight at once so the Ollama server is never idle between requests.
+    """
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    # pool.map yields results in submission order, so the vectors line up with `texts` without re-sorting
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = pool.map(embeddings.embed_documents, batches)
+        return [vector for batch in results for vector in batch]
+
+def cached_embed(texts, embeddings: OllamaEmbeddings, persist_dir: str, batch_size: int = 64):
+    """
+    Embed texts through a persistent content-hash cache: sha256(model|text) -> float32 vector in SQLite,
+    stored as embedding_cache.sqlite in persist_dir. Only unseen texts go to Ollama, so re-ingesting
+    the same PDF into this store costs no embedding calls.
+    """
+    model = embeddings.model
+    hashes = [hashlib.sha256(f"{model}|{text}".encode()).digest() for text in texts]
+    cache_path = os.path.join(persist_dir, "embedding_cache.sqlite")
+    # closing() closes the connection; the inner `with conn` only commits (or rolls back) the transaction
+    with closing(sqlite3.connect(cache_path)) as conn, conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS emb (hash BLOB PRIMARY KEY, vec BLOB)")
+        found = {}
+        unique = list(set(hashes))
+        for i in range(0, len(unique), 500):  # stay under SQLite's bound-parameter limit
+            part = unique[i:i + 500]
+            rows = conn.execute(
+                f"SELECT hash, vec FROM emb WHERE hash IN ({','.join('?' * len(part))})", part
+            )
+            found.update(rows)
+        misses = [i for i, h in enumerate(hashes) if h not in found]
+        if misses:
+            new_vectors = batch_embed([texts[i] for i in misses], embeddings, batch_size=batch_size)
+            new_rows = [
+                (hashes[i], np.asarray(v, dtype=np.float32).tobytes()) for i, v in zip(misses, new_vectors)
+            ]
+            conn.executemany("INSERT OR IGNORE INTO emb (hash, vec) VALUES (?, ?)", new_rows)
+            found.update(new_rows)
+    print(f"✅ Embeddings: {len(texts) - len(misses)} cached, {len(misses)} computed.")
+    return [np.frombuffer(found[h], dtype=np.float32).tolist() for h in hashes]
+
+def save_chunks_parquet(chunks, path: str):
+    """Persist chunks as two columns (content, JSON metadata) instead of pickling Document objects."""
+    table = pa.Table.from_pydict({
+        "content": [chunk.page_content for chunk in chunks],
+        "meta": [json.dumps(chunk.metadata) for chunk in chunks],
+    })
+    pq.write_table(table, path)
+
+def iter_chunks_parquet(path: str, batch_size: int = 1024):
+    """Yield Documents from the Parquet sidecar; only one record batch (batch_size rows) is held in memory at a time."""
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=["content", "meta"]):
+        for content, meta in zip(batch.column("content").to_pylist(), batch.column("meta").to_pylist()):
+            yield Document(page_content=content, metadata=json.loads(meta))
+
+def create_chroma_vectorstore(chunks, persist_dir: str, embedding_model: str = "all-minilm", batch_size: int = 64):
     """Create and persist Chroma vector store from text chunks."""
-    import pickle
     try:
-        vectorstore = Chroma.from_documents(
-            documents=chunks,
-            embedding=OllamaEmbeddings(model=embedding_model),
+        embeddings = get_embedder(embedding_model)
+        vectorstore = Chroma(
+            embedding_function=embeddings,
             persist_directory=persist_dir,
-            collection_metadata={"hnsw:space": "cosine"}
+            collection_metadata=COLLECTION_METADATA
+        )
+        # Embed up front in batches, then write vectors, texts and metadata in one add() (Chroma doesn't re-embed)
+        texts = [chunk.page_content for chunk in chunks]
+        vectors = cached_embed(texts, embeddings, persist_dir, batch_size=batch_size)
+        vectorstore._collection.add(
+            ids=chunk_ids(chunks),
+            embeddings=vectors,
+            documents=texts,
+            metadatas=[chunk.metadata for chunk in chunks],
         )
         print("✅ Chroma vector store initialized.")
         # Persist original chunks for BM25/hybrid search
-        orig_docs_path = os.path.join(persist_dir, "original_documents.pkl")
+        orig_docs_path = os.path.join(persist_dir, "original_documents.parquet")
         try:
-            with open(orig_docs_path, "wb") as f:
-                pickle.dump(chunks, f)
+            save_chunks_parquet(chunks, orig_docs_path)
             print(f"✅ Original chunks persisted: {orig_docs_path}")
         except Exception as e:
             print(f"❌ Failed to persist original chunks: {e}")
@@ -55,27 +176,73 @@ def create_chroma_vectorstore(chunks, persist_dir: str, embedding_model: str = "
         print(f"❌ Error initializing Chroma vector store: {e}")
         return None
 
+def sync_changed_pages(vectorstore, persist_dir: str, pdf_path: str):
+    """
+    Incremental ingestion: re-split and re-embed only the pages whose text hash differs from the manifest.
+    Chunks of changed or removed pages are deleted by their "page" metadata and replaced; untouched pages cost nothing.
+    If the PDF's bytes match the manifest's whole-file hash, the PDF isn't parsed at all.
+    """
+    if not os.path.isfile(pdf_path):
+        print(f"❌ PDF file not found: {pdf_path}")
+        return
+    manifest = load_manifest(persist_dir)
+    pdf_hash = file_sha256(pdf_path)
+    if manifest.get("pdf_sha256") == pdf_hash:
+        print("✅ PDF unchanged since last ingestion.")
+        return
+    pages = load_pdf_pages(pdf_path)
+    if pages is None:
+        return
+    hashes = page_hashes(pages)
+    prior = manifest.get("pages", manifest)  # Manifests written before the file hash are a flat page -> hash dict
+    changed = [int(i) for i, h in hashes.items() if prior.get(i) != h]
+    removed = [int(i) for i in prior if i not in hashes]
+    if not changed and not removed:
+        save_manifest(persist_dir, pdf_hash, hashes)  # Same text, new bytes: record them so the next start skips parsing
+        print("✅ PDF text unchanged since last ingestion.")
+        return
+    stale = set(changed + removed)
+    vectorstore._collection.delete(where={"page": {"$in": sorted(stale)}})
+    new_chunks = split_pages([pages[i] for i in changed])
+    if new_chunks:
+        texts = [chunk.page_content for chunk in new_chunks]
+        vectorstore._collection.add(
+            ids=chunk_ids(new_chunks),
+            embeddings=cached_embed(texts, vectorstore.embeddings, persist_dir),
+            documents=texts,
+            metadatas=[chunk.metadata for chunk in new_chunks],
+        )
+    # Keep the BM25 sidecar in step: drop the stale pages' chunks, add the new ones, restore page order
+    kept = [d for d in (vectorstore._original_documents or []) if d.metadata.get("page") not in stale]
+    documents = sorted(kept + new_chunks, key=lambda d: d.metadata.get("page", 0))
+    save_chunks_parquet(documents, os.path.join(persist_dir, "original_documents.parquet"))
+    vectorstore._original_documents = documents
+    save_manifest(persist_dir, pdf_hash, hashes)
+    print(f"✅ Re-ingested {len(changed)} changed page(s), dropped {len(removed)} removed page(s).")
+
 def load_or_create_vectorstore(persist_dir: str, pdf_path: str):
     """Load existing Chroma vector store or create a new one from PDF."""
-    import pickle
     # Try loading existing vector store
     if os.path.isdir(persist_dir):
         try:
             vectorstore = Chroma(
                 persist_directory=persist_dir,
-                embedding_function=OllamaEmbeddings(model="all-minilm"),
-                collection_metadata={"hnsw:space": "cosine"}
+                embedding_function=get_embedder("all-minilm"),
+                collection_metadata=COLLECTION_METADATA
             )
             print("✅ Loaded existing Chroma vector store.")
             # Load original chunks for BM25/hybrid search
-            orig_docs_path = os.path.join(persist_dir, "original_documents.pkl")
+            orig_docs_path = os.path.join(persist_dir, "original_documents.parquet")
             if os.path.isfile(orig_docs_path):
-                with open(orig_docs_path, "rb") as f:
-                    vectorstore._original_documents = pickle.load(f)
+                vectorstore._original_documents = list(iter_chunks_parquet(orig_docs_path))
                 print(f"✅ Loaded original chunks: {orig_docs_path}")
             else:
-                print(f"❌ original_documents.pkl not found. Re-ingestion required for BM25/hybrid search.")
+                print(f"❌ original_documents.parquet not found. Re-ingestion required for BM25/hybrid search.")
                 vectorstore._original_documents = None
+            try:
+                sync_changed_pages(vectorstore, persist_dir, pdf_path)
+            except Exception as e:
+                print(f"❌ Incremental ingestion failed, using the existing store: {e}")
             return vectorstore
         except Exception as e:
             print(f"ℹ️ Failed to load existing vector store: {e}\nCreating new one...")
@@ -83,10 +250,13 @@ def load_or_create_vectorstore(persist_dir: str, pdf_path: str):
     # Create new vector store if not found or failed to load
     if not ensure_directory_exists(persist_dir):
         return None
-    chunks = load_pdf_chunks(pdf_path)
-    if chunks is None:
+    pages = load_pdf_pages(pdf_path)
+    if pages is None:
         return None
-    return create_chroma_vectorstore(chunks, persist_dir)
+    vectorstore = create_chroma_vectorstore(split_pages(pages), persist_dir)
+    if vectorstore is not None:
+        save_manifest(persist_dir, file_sha256(pdf_path), page_hashes(pages))
+    return vectorstore
 
 # Configuration
 PERSIST_DIR = "./chroma_db"
@@ -2,13 +2,19 @@ import asyncio
 from typing import TypedDict, Sequence, Annotated
 from langchain_core.messages import HumanMessage, SystemMessage, BaseMessage
 from langchain_core.tools import tool
-from langchain_ollama import ChatOllama
 from langgraph.graph import StateGraph, START, END
 from langgraph.prebuilt import ToolNode
 from langgraph.graph.message import add_messages
 from langchain_community.retrievers import BM25Retriever
-from langchain.retrievers import EnsembleRetriever
 from ingestion_pipline import vectorstore
+from models import get_chat
+from stream_writer import StreamWriter
+
+# Optional faster event loop (uvloop is not available on Windows)
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 SYSTEM_PROMPT = (
     "You are an intelligent AI assistant who answers questions about Stock Market Performance in 2024 "
@@ -17,6 +23,7 @@ SYSTEM_PROMPT = (
     "If you need to look up some information before asking a follow up question, you are allowed to do that! "
     "Please always cite the specific parts of the documents you use in your answers."
 )
+SYSTEM_MESSAGE = SystemMessage(content=SYSTEM_PROMPT)
 
 # --- Retriever Setup ---
 vector_retriever = vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": 3})
@@ -27,30 +34,38 @@ if not documents:
         "Original documents not found in vectorstore. "
         "Please re-ingest or update ingestion_pipline.py."
     )
+
 bm25_retriever = BM25Retriever.from_documents(documents, k=3)
 
-hybrid_retriever = EnsembleRetriever(
-    retrievers=[vector_retriever, bm25_retriever],
-    weights=[0.7, 0.3]
-)
+# Relative weight of each retriever's ranking in the fusion (vector, BM25)
+RETRIEVER_WEIGHTS = [0.7, 0.3]
 
-def reciprocal_rank_fusion(results_lists, k=5, weight=60):
+def reciprocal_rank_fusion(results_lists, k=5, weight=60, list_weights=None):
     scores = {}
-    for results in results_lists:
+    doc_map = {}
+    list_weights = list_weights or [1.0] * len(results_lists)
+    for results, list_weight in zip(results_lists, list_weights):
         for rank, doc in enumerate(results):
-            doc_id = getattr(doc, "id", None) or getattr(doc, "page_content", None)
-            scores[doc_id] = scores.get(doc_id, 0) + 1.0 / (weight + rank + 1)
+            # Key on the text: Chroma results carry an id but the BM25 documents don't,
+            # so ids would give the same chunk two keys and its scores would never be summed
+            doc_id = doc.page_content
+            scores[doc_id] = scores.get(doc_id, 0) + list_weight / (weight + rank + 1)
+            doc_map[doc_id] = doc
     sorted_docs = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-    doc_map = {getattr(doc, "id", None) or getattr(doc, "page_content", None): doc for results in results_lists for doc in results}
     return [doc_map[doc_id] for doc_id, _ in sorted_docs[:k]]
 
 @tool
-def retriever_tool(query: str) -> str:
+async def retriever_tool(query: str) -> str:
     """
     Searches and returns information from the Stock Market Performance 2024 document using both similarity and BM25 search, fused by RRF.
     """
-    hybrid_fused_docs = hybrid_retriever.invoke(query)
-    fused_docs = reciprocal_rank_fusion([hybrid_fused_docs], k=5)
+    # Run both retrievers at the same time: latency is max(vector, bm25) instead of the sum.
+    # BM25 is plain CPU work with no async API, so it runs in a worker thread.
+    vector_docs, bm25_docs = await asyncio.gather(
+        vector_retriever.ainvoke(query),
+        asyncio.to_thread(bm25_retriever.invoke, query),
+    )
+    fused_docs = reciprocal_rank_fusion([vector_docs, bm25_docs], k=5, list_weights=RETRIEVER_WEIGHTS)
     if not fused_docs:
         return "No relevant information found in the Stock Market Performance 2024 document."
     return "\n\n".join([f"Document {i+1}:\n{doc.page_content}" for i, doc in enumerate(fused_docs)])
@@ -59,16 +74,20 @@ class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
 
 tools = [retriever_tool]
-llm = ChatOllama(model="llama3.2:3b", temperature=0, streaming=True).bind_tools(tools)
+# keep_alive keeps the weights loaded between turns (Ollama unloads after ~5 min idle by default);
+# a fixed num_ctx stops the server from reloading the model when the context size changes.
+llm = get_chat("llama3.2:3b", temperature=0, streaming=True, keep_alive="24h", num_ctx=4096).bind_tools(tools)
 
 def llm_node(state: AgentState) -> AgentState:
-    messages = [SystemMessage(content=SYSTEM_PROMPT)] + state["messages"]
-    response = llm.invoke(messages)
-    return {"messages": state["messages"] + [response]}
+    response = llm.invoke([SYSTEM_MESSAGE, *state["messages"]])
+    # Return only the new message; add_messages appends it. Returning the whole history
+    # made the reducer copy and re-match every earlier message by ID on each turn.
+    return {"messages": [response]}
 
 def should_continue(state: AgentState) -> str:
-    last_message = state["messages"][-1]
-    return "continue" if getattr(last_message, "tool_calls", None) else "END"
+    # The last message always comes from llm_node (an AIMessage), so tool_calls is always present:
+    # read it directly instead of getattr with a default. END is returned as-is and needs no mapping.
+    return "continue" if state["messages"][-1].tool_calls else END
 
 graph = StateGraph(AgentState)
 graph.add_node("llm_node", llm_node)
@@ -76,7 +95,7 @@ graph.add_node("tool_node", ToolNode(tools=tools))
 graph.add_edge(START, "llm_node")
 graph.add_conditional_edges("llm_node", should_continue, {
     "continue": "tool_node",
-    "END": END
+    END: END
 })
 graph.add_edge("tool_node", "llm_node")
 app = graph.compile()
@@ -90,11 +109,22 @@ async def run_agent():
             break
         input_state = {"messages": [HumanMessage(content=user_input)]}
         print("Thinking...\n")
-        async for event in app.astream_events(input=input_state, version="v2"):
-            if event["event"] == "on_chat_model_stream":
-                chunk = event["data"]["chunk"]
-                if chunk and chunk.content:
-                    print(chunk.content, end="", flush=True)
+        out = StreamWriter()
+        # stream_mode="messages" yields (token_chunk, metadata) straight from the LLM, without the
+        # per-token event dict (run_id, parent_ids, ...) that astream_events builds
+        async for mode, chunk in app.astream(input_state, stream_mode=["messages", "updates"]):
+            if mode == "messages":
+                message, metadata = chunk
+                if metadata.get("langgraph_node") == "llm_node" and message.content:
+                    out.write(message.content)
+            elif "tool_node" in chunk:
+                out.flush()
+                for tool_message in chunk["tool_node"]["messages"]:
+                    print(f"\n🔎 {tool_message.name} returned {len(tool_message.content)} chars\n")
+        out.flush()
 
 if __name__ == "__main__":
-    asyncio.run(run_agent())
+    if uvloop is not None:
+        uvloop.run(run_agent())
+    else:
+        asyncio.run(run_agent())
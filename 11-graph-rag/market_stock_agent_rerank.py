@@ -1,8 +1,13 @@
 import os
-import time
+import json
+import hashlib
+import threading
+from functools import lru_cache
 import asyncio
 from typing import TypedDict, Sequence, Annotated
+from langchain_core.documents import Document
 from langchain_core.messages import HumanMessage, SystemMessage, BaseMessage
+from langchain_core.messages.utils import trim_messages, count_tokens_approximately
 from langchain_core.tools import tool
 from langchain_ollama import ChatOllama, OllamaEmbeddings
 from langchain_community.document_loaders import PyPDFLoader
@@ -11,59 +16,235 @@ from langchain_chroma import Chroma
 from langgraph.graph import StateGraph, START, END
 from langgraph.prebuilt import ToolNode
 from langgraph.graph.message import add_messages
-from sentence_transformers import CrossEncoder
+from stream_writer import StreamWriter
+import numpy as np
 
 PDF_FILENAME = "Stock_Market_Performance_2024.pdf"
 EMBED_MODEL = "all-minilm"
 CHUNK_SIZE = 1500
 CHUNK_OVERLAP = 250
+HISTORY_MAX_TOKENS = 3000  # Chat history budget per LLM call (num_ctx is 4096)
+EMBED_BATCH_SIZE = 64
+EMBED_CONCURRENCY = 4  # Embedding requests in flight at once, same as ingestion_pipline's max_workers
+# Candidates fetched from the vector store before reranking down to 3. A wide net is cheap with HNSW,
+# gives the reranker more to choose from, and still fits one RERANK_BATCH_SIZE forward pass.
+CANDIDATE_K = 32
+# Chroma's HNSW index settings: M = graph links per node, construction_ef = build-time candidate list,
+# search_ef = query-time candidate list (recall vs latency). Fixed when the collection is created.
+# "ip" (inner product) on unit-length vectors ranks exactly like cosine, without re-normalizing per comparison.
+HNSW_METADATA = {"hnsw:space": "ip", "hnsw:M": 32, "hnsw:construction_ef": 200, "hnsw:search_ef": 64}
 SYSTEM_PROMPT = """
 You are an intelligent AI assistant who answers questions about Stock Market Performance in 2024 based on the PDF document loaded into your knowledge base.
 Use the retriever tool available to answer questions about the stock market performance data. You can make multiple calls if needed.
 If you need to look up some information before asking a follow up question, you are allowed to do that!
 Please always cite the specific parts of the documents you use in your answers.
 """
+# Built once and reused on every LLM call
+SYS_MSG = SystemMessage(content=SYSTEM_PROMPT)
 
 # PDF Loading & Chunking
 pdf_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", PDF_FILENAME))
 if not os.path.isfile(pdf_path):
     raise FileNotFoundError(f"PDF file not found: {pdf_path}")
 
-pdf_loader = PyPDFLoader(pdf_path)
-pages = pdf_loader.load()
-print(f"✅ PDF loaded. Pages: {len(pages)}")
-
-# Split the loaded PDF pages into smaller text chunks for embedding and retrieval
-text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
-chunks = text_splitter.split_documents(pages)
-print(f"✅ Text chunks created: {len(chunks)}")
+# Content hash of the PDF plus every setting that shapes chunks and vectors: same key -> same chunks and embeddings
+with open(pdf_path, "rb") as f:
+    pdf_hash = hashlib.sha256(f.read()).hexdigest()
+content_key = hashlib.sha256(repr((pdf_hash, CHUNK_SIZE, CHUNK_OVERLAP, EMBED_MODEL)).encode()).hexdigest()
 
 # Vector Store Setup
 persist_directory = os.path.join(os.path.dirname(__file__), "stock_market_vector_store")
 os.makedirs(persist_directory, exist_ok=True)
 
-vectorstore = Chroma.from_documents(
-    documents=chunks,
-    embedding=OllamaEmbeddings(model=EMBED_MODEL),
-    persist_directory=persist_directory
+def load_chunks():
+    """
+    Load and split the PDF, memoized on disk by content key: PDF text extraction and splitting
+    run once per PDF/chunking settings, not on every start.
+    The cache is plain JSON (text + metadata per chunk), so loading it never unpickles objects.
+    """
+    chunks_cache_path = os.path.join(persist_directory, f"chunks_{content_key[:16]}.json")
+    if os.path.isfile(chunks_cache_path):
+        with open(chunks_cache_path, encoding="utf-8") as f:
+            chunks = [Document(page_content=text, metadata=meta) for text, meta in json.load(f)]
+        print(f"✅ Loaded cached text chunks: {len(chunks)}")
+        return chunks
+
+    pdf_loader = PyPDFLoader(pdf_path)
+    pages = pdf_loader.load()
+    print(f"✅ PDF loaded. Pages: {len(pages)}")
+
+    # Split the loaded PDF pages into smaller text chunks for embedding and retrieval
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    chunks = text_splitter.split_documents(pages)
+    print(f"✅ Text chunks created: {len(chunks)}")
+    with open(chunks_cache_path, "w", encoding="utf-8") as f:
+        json.dump([(chunk.page_content, chunk.metadata) for chunk in chunks], f)
+    return chunks
+
+# The persisted index is only valid for the same content key and HNSW settings.
+# Their hash is stored next to the index; on a match the stored vectors are reused instead of re-embedding every chunk.
+index_key = hashlib.sha256(repr((content_key, HNSW_METADATA)).encode()).hexdigest()
+index_key_path = os.path.join(persist_directory, "index_key.txt")
+# Normalized chunk embeddings on disk: rebuilding the index (e.g. new HNSW settings) doesn't re-embed anything
+embedding_cache_path = os.path.join(persist_directory, f"embeddings_{content_key[:16]}.npz")
+
+# One embeddings client for ingestion and queries: its HTTP connection to Ollama stays open between calls.
+# keep_alive keeps all-minilm loaded, num_thread lets Ollama use every core for the CPU-side work.
+embeddings = OllamaEmbeddings(
+    model=EMBED_MODEL,
+    keep_alive="24h",
+    num_thread=os.cpu_count(),
+    client_kwargs={"timeout": 30},
+)
+vectorstore = Chroma(
+    embedding_function=embeddings,
+    persist_directory=persist_directory,
+    collection_metadata=HNSW_METADATA
 )
-retriever = vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": 8})
-print("✅ Chroma vector store initialized.")
+
+def normalize(vectors):
+    """L2-normalize vectors (rows) so their inner product equals cosine similarity."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+async def embed_chunks(texts):
+    """
+    Embed texts in batches of EMBED_BATCH_SIZE (one Ollama request per batch), sending the batches concurrently.
+    A semaphore keeps at most EMBED_CONCURRENCY requests in flight, so a large PDF doesn't flood Ollama.
+    """
+    batches = [texts[i:i + EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+    sem = asyncio.Semaphore(EMBED_CONCURRENCY)
+
+    async def embed_batch(batch):
+        async with sem:
+            return await embeddings.aembed_documents(batch)
+
+    # gather returns results in submission order, so the vectors line up with `texts`
+    results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+    return [vector for batch in results for vector in batch]
+
+def read_index_key():
+    """The index key stored with the persisted index, or None if there is none yet."""
+    if not os.path.isfile(index_key_path):
+        return None
+    with open(index_key_path) as f:
+        return f.read()
+
+if read_index_key() == index_key:
+    print("✅ Loaded existing Chroma vector store.")
+else:
+    # Cold or stale index: drop old vectors and rebuild, embedding the chunks only if no cached vectors exist
+    vectorstore.reset_collection()
+    chunks = load_chunks()
+    texts = [chunk.page_content for chunk in chunks]
+    if os.path.isfile(embedding_cache_path):
+        vectors = np.load(embedding_cache_path)["vectors"]
+        print(f"✅ Loaded cached embeddings: {embedding_cache_path}")
+    else:
+        vectors = normalize(asyncio.run(embed_chunks(texts)))
+        np.savez(embedding_cache_path, vectors=vectors)
+    # Write the precomputed vectors straight to the collection, so Chroma doesn't embed again
+    vectorstore._collection.add(
+        ids=[f"chunk-{i}" for i in range(len(chunks))],
+        embeddings=vectors.tolist(),
+        documents=texts,
+        metadatas=[chunk.metadata for chunk in chunks],
+    )
+    with open(index_key_path, "w") as f:
+        f.write(index_key)
+    print("✅ Chroma vector store initialized.")
 
 # Reranker Setup
 RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
-reranker = CrossEncoder(RERANK_MODEL)
+RERANK_BATCH_SIZE = 32
+_reranker = None
+_reranker_lock = threading.Lock()
+
+def get_reranker():
+    """
+    Load the CrossEncoder on first use instead of at import. PyTorch and sentence_transformers are
+    imported (and CUDA probed) here too, so startup doesn't load them and a session that never calls
+    the retriever tool never pays for them. The lock keeps concurrent tool calls from loading it twice.
+    """
+    global _reranker
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                import torch
+                from sentence_transformers import CrossEncoder
+                device = "cuda" if torch.cuda.is_available() else "cpu"
+                reranker = CrossEncoder(RERANK_MODEL, device=device)
+                if device == "cuda":
+                    reranker.model.half()  # fp16 halves memory traffic per forward pass on GPU
+                else:
+                    # CPU: dynamic int8 quantization of the Linear layers (weights stored as int8, activations
+                    # quantized on the fly). Several times faster matmuls on CPUs with VNNI/AVX2, negligible effect on ranking.
+                    reranker.model = torch.ao.quantization.quantize_dynamic(reranker.model, {torch.nn.Linear}, dtype=torch.qint8)
+                _reranker = reranker
+    return _reranker
+
+# Token IDs per chunk text (without special tokens). Chunks come from a fixed corpus,
+# so each one is tokenized once and only the query is tokenized per call.
+_doc_token_cache = {}
+
+def _doc_token_ids(text):
+    ids = _doc_token_cache.get(text)
+    if ids is None:
+        ids = _doc_token_cache[text] = get_reranker().tokenizer(text, add_special_tokens=False)["input_ids"]
+    return ids
+
+def score_pairs(query, texts):
+    """
+    CrossEncoder scores for (query, text) pairs, built from cached document token IDs.
+    Same inputs as reranker.predict ([CLS] query [SEP] doc [SEP], doc truncated to fit), minus re-tokenizing the docs.
+    """
+    reranker = get_reranker()
+    import torch  # Already loaded by get_reranker(); this just binds the name
+    tokenizer = reranker.tokenizer
+    query_ids = tokenizer(query, add_special_tokens=False)["input_ids"]
+    max_length = reranker.max_length or tokenizer.model_max_length
+    doc_budget = max(max_length - len(query_ids) - tokenizer.num_special_tokens_to_add(pair=True), 0)
+    features = []
+    for text in texts:
+        doc_ids = _doc_token_ids(text)[:doc_budget]
+        feature = {"input_ids": tokenizer.build_inputs_with_special_tokens(query_ids, doc_ids)}
+        if "token_type_ids" in tokenizer.model_input_names:
+            feature["token_type_ids"] = tokenizer.create_token_type_ids_from_sequences(query_ids, doc_ids)
+        features.append(feature)
+
+    scores = []
+    with torch.inference_mode():
+        for start in range(0, len(features), RERANK_BATCH_SIZE):
+            batch = tokenizer.pad(features[start:start + RERANK_BATCH_SIZE], return_tensors="pt")
+            logits = reranker.model(**batch.to(reranker.model.device)).logits
+            scores.append(logits.squeeze(-1).float().cpu().numpy())
+    return np.concatenate(scores) if scores else np.empty(0, dtype=np.float32)
 
 def rerank(query, docs, top_k=3):
-    pairs = [(query, doc.page_content) for doc in docs]
-    scores = reranker.predict(pairs)
-    # Sort docs by score descending
-    sorted_docs = [doc for _, doc in sorted(zip(scores, docs), key=lambda x: x[0], reverse=True)]
-    return sorted_docs[:top_k]
+    # All candidate pairs are scored in batched forward passes (one pass for up to RERANK_BATCH_SIZE docs)
+    scores = score_pairs(query, [doc.page_content for doc in docs])
+    # Top-k by index: argpartition picks the k best in O(n), then only those k are sorted (descending)
+    top_k = min(top_k, len(docs))
+    idx = np.argpartition(-scores, top_k - 1)[:top_k]
+    idx = idx[np.argsort(-scores[idx])]
+    return [docs[i] for i in idx]
+
+@lru_cache(maxsize=256)
+def search_and_rerank(query: str) -> tuple:
+    """
+    Embed the query once, over-fetch CANDIDATE_K chunks by vector and rerank them down to 3.
+    Cached per normalized query: the agent often repeats a lookup within a chat, and a hit skips
+    the embedding call, the vector search and the reranker.
+    """
+    query_vector = normalize(embeddings.embed_query(query)).tolist()
+    docs = vectorstore.similarity_search_by_vector(query_vector, k=CANDIDATE_K)
+    if not docs:
+        return ()
+    return tuple(doc.page_content for doc in rerank(query, docs, top_k=3))
 
 # Tool Definition
 @tool
-def retriever_tool(query: str) -> str:
+async def retriever_tool(query: str) -> str:
     """
     Tool: Searches and returns information from the Stock Market Performance 2024 document, with reranking.
     Args:
@@ -71,11 +252,16 @@ def retriever_tool(query: str) -> str:
     Returns:
         str: Relevant document chunks or a not found message.
     """
-    docs = retriever.invoke(query)
-    if not docs:
+    # Normalize case and whitespace so trivially different phrasings share a cache entry.
+    # Embedding, vector search and the CrossEncoder are blocking calls: run them in a worker thread
+    # so the event loop keeps streaming tokens meanwhile.
+    contents = await asyncio.to_thread(search_and_rerank, " ".join(query.lower().split()))
+    if not contents:
         return "No relevant information found in the Stock Market Performance 2024 document."
-    reranked_docs = rerank(query, docs, top_k=3)
-    return "\n\n".join([f"Document {i+1} (reranked):\n{doc.page_content}" for i, doc in enumerate(reranked_docs)])
+    # The splitter already caps each chunk at CHUNK_SIZE characters, so the three documents need no extra truncation
+    return "\n\n".join(
+        f"Document {i} (reranked):\n{content}" for i, content in enumerate(contents, start=1)
+    )
 
 # Agent State
 class AgentState(TypedDict):
@@ -83,35 +269,48 @@ class AgentState(TypedDict):
 
 # LangGraph Nodes
 tools = [retriever_tool]
-llm = ChatOllama(model="llama3.2:3b", temperature=0, streaming=True).bind_tools(tools)
+# keep_alive keeps the model (and its KV cache for the unchanged system-prompt prefix) loaded between calls
+llm = ChatOllama(model="llama3.2:3b", temperature=0, streaming=True, keep_alive="24h", num_ctx=4096).bind_tools(tools)
+
+def split_current_turn(messages):
+    """Split messages into (earlier turns, current turn), where the current turn starts at the last HumanMessage."""
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return messages[:i], messages[i:]
+    return [], list(messages)
 
 def llm_node(state: AgentState) -> AgentState:
-    messages = [SystemMessage(content=SYSTEM_PROMPT)] + state["messages"]
-    response = llm.invoke(messages)
-    return {"messages": state["messages"] + [response]}
+    # The current turn (the user's question and any tool calls/results since) is always sent in full.
+    # Only earlier turns are trimmed to what is left of HISTORY_MAX_TOKENS, so each call in a long
+    # conversation stays bounded without ever dropping the question being answered.
+    # The system prompt stays first and unchanged.
+    earlier, current = split_current_turn(state["messages"])
+    budget = HISTORY_MAX_TOKENS - count_tokens_approximately(current)
+    history = trim_messages(
+        earlier,
+        strategy="last",
+        token_counter=count_tokens_approximately,
+        max_tokens=budget,
+        start_on="human",
+    ) if earlier and budget > 0 else []
+    response = llm.invoke([SYS_MSG, *history, *current])
+    # add_messages appends the new message; returning the whole history made the reducer re-merge it
+    return {"messages": [response]}
 
 def should_continue(state: AgentState) -> str:
-    last_message = state["messages"][-1]
-    return "continue" if getattr(last_message, "tool_calls", None) else "END"
+    # Return the next node name (or the END sentinel) directly; no path map needed.
+    # The last message always comes from llm_node, so tool_calls is always present.
+    return "tool_node" if state["messages"][-1].tool_calls else END
 
 # LangGraph Construction
 graph = StateGraph(AgentState)
 graph.add_node("llm_node", llm_node)
 graph.add_node("tool_node", ToolNode(tools=tools))
 graph.add_edge(START, "llm_node")
-graph.add_conditional_edges("llm_node", should_continue, {
-    "continue": "tool_node",
-    "END": END
-})
+graph.add_conditional_edges("llm_node", should_continue, ["tool_node", END])
 graph.add_edge("tool_node", "llm_node")
 app = graph.compile()
 
-def type_out(text: str, delay: float = 0.01):
-    for char in text:
-        print(char, end='', flush=True)
-        time.sleep(delay)
-    print()
-
 async def run_agent():
     print("📊 Stock Market Q&A Agent Ready (with Reranking)")
     print("Type 'exit' to quit.")
@@ -123,12 +322,14 @@ async def run_agent():
 
         input_state = {"messages": [HumanMessage(content=user_input)]}
         print("Thinking...\n")
+        out = StreamWriter()
         async for event in app.astream_events(input=input_state, version="v2"):
             kind = event["event"]
             if kind == "on_chat_model_stream":
                 chunk = event["data"]["chunk"]
                 if chunk and chunk.content:
-                    print(chunk.content, end="", flush=True)
+                    out.write(chunk.content)
+        out.flush()
 
 if __name__ == "__main__":
     asyncio.run(run_agent())
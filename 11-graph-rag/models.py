@@ -0,0 +1,17 @@
+# models.py
+# Shared model factories for the RAG scripts in this folder.
+# Every module that asks for the same model (and settings) gets the same client object,
+# so each Ollama client, with its HTTP connection pool, is built once per process instead of once per import.
+
+from functools import lru_cache
+from langchain_ollama import ChatOllama, OllamaEmbeddings
+
+@lru_cache(maxsize=None)
+def get_chat(model: str = "llama3.2:3b", **kwargs) -> ChatOllama:
+    """Return the shared ChatOllama for this model and settings (kwargs must be hashable)."""
+    return ChatOllama(model=model, **kwargs)
+
+@lru_cache(maxsize=None)
+def get_embedder(model: str = "all-minilm", **kwargs) -> OllamaEmbeddings:
+    """Return the shared OllamaEmbeddings for this model and settings (kwargs must be hashable)."""
+    return OllamaEmbeddings(model=model, **kwargs)
@@ -1,11 +1,13 @@
-from ingestion_pipline import vectorstore
-from typing import TypedDict, List, Dict, Tuple, Hashable
-from langchain_ollama import ChatOllama
+import asyncio
+import numpy as np
+from ingestion_pipline import vectorstore, cached_embed, PERSIST_DIR
+from typing import TypedDict, List, Tuple, Hashable
+from models import get_chat
 
 class AgentState(TypedDict):
     queryList: list[str]
 
-llm = ChatOllama(model="llama3.2:3b", temperature=0, streaming=True)
+llm = get_chat("llama3.2:3b", temperature=0, streaming=True)
 original_query = "Provide a summary of the stock market performance in 2024."
 
 # NOTE:
@@ -22,15 +24,20 @@ prompt = (
 response = llm_with_tool.invoke(prompt)
 query_variations = response["queryList"]
 
-retrieved_docs_lists = []
+# Query vectors go through the same content-hash cache as the chunks, so re-running with the same variations skips Ollama
+query_vectors = cached_embed(query_variations, vectorstore.embeddings, PERSIST_DIR)
+
+async def search_all(vectors):
+    """Run the per-variation vector searches concurrently: total latency is the slowest search, not the sum."""
+    return await asyncio.gather(
+        *(vectorstore.asimilarity_search_by_vector(vector, k=2) for vector in vectors)
+    )
+
 for idx, query in enumerate(query_variations, start=1):
     print(f"Query {idx}: {query}")
-    docs = vectorstore.as_retriever(
-        search_type="similarity",
-        search_kwargs={"k": 2}
-    ).invoke(query)
-    doc_ids = [doc.page_content for doc in docs]
-    retrieved_docs_lists.append(doc_ids)
+retrieved_docs_lists = [
+    [doc.page_content for doc in docs] for docs in asyncio.run(search_all(query_vectors))
+]
 
 # NOTE: 
 # RRF (Reciprocal Rank Fusion) is a method to combine multiple ranked lists into a single ranking.
@@ -39,12 +46,17 @@ def rrf_fuse(
     rankings: List[List[Hashable]],
     k: int = 60
 ) -> List[Tuple[Hashable, float]]:
-    scores: Dict[Hashable, float] = {}
-    for ranked_list in rankings:
-        for rank, doc_id in enumerate(ranked_list, start=1):
-            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
-    fused = sorted(scores.items(), key=lambda x: (-x[1], str(x[0])))
-    return fused
+    # Map each doc id to an int column through a dict (any hashable id works, tuples and mixed types included),
+    # then accumulate every occurrence's 1 / (k + rank) in one np.add.at
+    columns = {}
+    inv = [columns.setdefault(doc_id, len(columns)) for ranked_list in rankings for doc_id in ranked_list]
+    if not inv:
+        return []
+    ranks = np.concatenate([np.arange(1, len(ranked_list) + 1, dtype=np.float64) for ranked_list in rankings])
+    scores = np.zeros(len(columns), dtype=np.float64)
+    np.add.at(scores, inv, 1.0 / (k + ranks))
+    # Highest score first, ties broken by str(id) as before
+    return sorted(zip(columns, scores.tolist()), key=lambda x: (-x[1], str(x[0])))
 
 fused_docs = rrf_fuse(retrieved_docs_lists)
 
@@ -0,0 +1,28 @@
+# stream_writer.py
+# Buffered stdout writer shared by the streaming agents in this folder (market_stock_agent.py, market_stock_agent_rerank.py).
+
+import sys
+import time
+
+class StreamWriter:
+    """
+    Buffers streamed tokens and writes them to stdout in batches (every `max_items` tokens or `max_delay` seconds),
+    instead of one write + flush per token.
+    """
+    def __init__(self, max_items: int = 16, max_delay: float = 0.05):
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self.buffer = []
+        self.last_flush = time.monotonic()
+
+    def write(self, text: str):
+        self.buffer.append(text)
+        if len(self.buffer) >= self.max_items or "\n" in text or time.monotonic() - self.last_flush >= self.max_delay:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            sys.stdout.write("".join(self.buffer))
+            self.buffer.clear()
+        sys.stdout.flush()
+        self.last_flush = time.monotonic()